@@ -1,5 +1,24 @@
 from .aio import AsyncClient, AsyncGraph, AsyncProxy, AsyncRemote, AsyncResource
-from .base import Client, Graph, Proxy, Remote, Resource
+from .base import (
+    Cache,
+    Client,
+    Codec,
+    ContentTypes,
+    CursorPages,
+    DiskCache,
+    Graph,
+    Hedge,
+    Hooks,
+    Limiter,
+    OffsetPages,
+    Pages,
+    Proxy,
+    Remote,
+    Resource,
+    Retry,
+    SingleFlight,
+    Token,
+)
 
 
 def singleton(*args, **kwargs):
@@ -1,42 +1,225 @@
 import asyncio
 import contextlib
-from collections.abc import Callable, Mapping
+import functools
+import itertools
+import threading
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable, Mapping
 from urllib.parse import urljoin
 
 import httpx2 as httpx
 
-from .base import BaseClient, Graph, Proxy, Remote, Resource, validate
+from .base import (
+    BaseClient,
+    Batch,
+    ContentTypes,
+    Graph,
+    Hedge,
+    ItemParser,
+    Joined,
+    Pages,
+    Proxy,
+    Remote,
+    Resource,
+    Retry,
+    Stats,
+    Timings,
+    Token,
+    validate,
+)
 
 
 class AsyncClient(BaseClient, httpx.AsyncClient):
+    """An `httpx.AsyncClient` with base url and synchronous support.
+
+    Synchronous calls share an event loop, and therefore the connection pool, with all clones.
+    """
+
+    def __init__(self, url: str, **kwargs):
+        super().__init__(url, **kwargs)
+        self._runner = asyncio.Runner()
+        self._lock = threading.Lock()
+
+    async def send(self, request, **kwargs):
+        """Send request with the optional [hooks][clients.base.Hooks]."""
+        if self.hooks is None:
+            return await super().send(request, **kwargs)
+        timings, response = Timings(), None
+        request.extensions |= {"trace": timings.atrace, "timings": timings}
+        self.hooks.before(request)
+        try:
+            with timings.time("send"):
+                response = await super().send(request, **kwargs)
+        finally:
+            self.hooks.after(request, response, timings)
+        return response
+
+    async def _send_single_request(self, request):
+        """Send each request of auth flows and redirects with the optional limiter."""
+        if self.limiter is None:
+            return await super()._send_single_request(request)
+        timings, response = request.extensions.get("timings"), None
+        with timings.time("wait") if timings is not None else contextlib.nullcontext():
+            await self.limiter.aacquire()
+        try:
+            response = await super()._send_single_request(request)
+        finally:
+            await self.limiter.arelease(response)
+        return response
+
+    def stream(self, method, path, **kwargs):
+        """Send request with relative or absolute path and stream response."""
+        return super().stream(method, self._url(path), **self._encode(kwargs))
+
     def run(self, name: str, *args, **kwargs):
         """Synchronously call method and run coroutine."""
-        return asyncio.new_event_loop().run_until_complete(getattr(self, name)(*args, **kwargs))
+        with self._lock:
+            return self._runner.run(getattr(self, name)(*args, **kwargs))
+
+    def run_many(self, coros: Iterable[Awaitable], return_exceptions: bool = False) -> list:
+        """Synchronously run coroutines concurrently and return results."""
+        with self._lock:
+            return self._runner.run(self._gather(*coros, return_exceptions=return_exceptions))
+
+    @staticmethod
+    async def _gather(*coros, **kwargs) -> list:
+        return await asyncio.gather(*coros, **kwargs)
+
+    def close(self):
+        """Synchronously close the client and its event loop, unless this is a view."""
+        self.run("aclose")
+        if not self._view:
+            self._runner.close()
+
+    async def aclose(self):
+        """Close transport and mounts, unless this is a view."""
+        if self._view:
+            self._state = httpx._client.ClientState.CLOSED
+        else:
+            await super().aclose()
+
+    async def __aexit__(self, *args):
+        if self._view:
+            self._state = httpx._client.ClientState.CLOSED
+        else:
+            await super().__aexit__(*args)
+
+    async def gather(
+        self, items: Iterable, limit: int = 10, ordered: bool = True, return_exceptions=False
+    ) -> AsyncIterator:
+        """Concurrently GET paths or params with tasks, sharing the connection pool.
+
+        Args:
+            items: paths, or mappings of params
+            limit: maximum number of concurrent requests
+            ordered: yield results in order, or `(item, result)` pairs as completed
+            return_exceptions: yield exceptions as results instead of raising
+        """
+        semaphore = asyncio.Semaphore(limit)
+
+        async def fetch(item):
+            async with semaphore:
+                try:
+                    params = isinstance(item, Mapping)
+                    return item, await (self.get(params=item) if params else self.get(item))
+                except Exception as exc:
+                    if not return_exceptions:
+                        raise
+                    return item, exc
+
+        tasks = [asyncio.ensure_future(fetch(item)) for item in items]
+        try:
+            for task in tasks if ordered else asyncio.as_completed(tasks):
+                item, result = await task
+                yield result if ordered else (item, result)
+        finally:
+            for task in tasks:
+                task.cancel()
 
 
 class AsyncResource(AsyncClient):
-    """An `AsyncClient` which returns json content and has syntactic support for requests."""
+    """An `AsyncClient` which returns json content and has syntactic support for requests.
+
+    Each resource copies the `content_type` registry, so registered types are shared only with
+    its views.
+    """
 
     client = property(AsyncClient.clone, doc="upcasted `AsyncClient`")
-    __getattr__ = AsyncClient.__truediv__
+    __getattr__ = Resource.__getattr__
+    _fresh = Resource._fresh
     __getitem__ = AsyncClient.get
-    content_type = staticmethod(Resource.content_type)
+    content_type = Resource.content_type
     __call__ = Resource.__call__
+    cache, flights = Resource.cache, Resource.flights
+    _decode, _content = Resource._decode, Resource._content
+    _key, _flight = Resource._key, Resource._flight
+    _lookup, _store = Resource._lookup, Resource._store
+
+    def __init__(self, url: str, **kwargs):
+        super().__init__(url, **kwargs)
+        if isinstance(self.content_type, ContentTypes):
+            self.content_type = self.content_type.copy()
 
     async def request(self, method, path, **kwargs):
-        """Send request with path and return processed content."""
-        response = (await super().request(method, path, **kwargs)).raise_for_status()
-        match self.content_type(response):
-            case "json":
-                return response.json()
-            case "text":
-                return response.text
-        return response.content
+        """Send request with path and return processed content.
+
+        GET requests use the optional [cache][clients.base.Cache], and are optionally
+        [coalesced][clients.base.SingleFlight].
+        """
+        if method != "GET":
+            return self._decode((await super().request(method, path, **kwargs)).raise_for_status())
+        if self.flights is None:
+            return await self._get(path, kwargs)
+        return await self.flights.acall(self._flight(path, kwargs), self._get, path, kwargs)
+
+    async def _get(self, path: str, kwargs: dict):
+        if self.cache is None:
+            return self._decode((await super().request("GET", path, **kwargs)).raise_for_status())
+        key, entry = self._lookup(path, kwargs)
+        if entry and entry.expires > time.time():
+            return entry.content
+        return self._store(key, entry, await super().request("GET", path, **kwargs))
+
+    async def stream(
+        self, method: str = "GET", path: str = "", items: Iterable[str] | None = None, **kwargs
+    ) -> AsyncIterator:
+        """Iterate lines or chunks from streamed request.
+
+        Args:
+            items: optionally iterate items of a json array, at a path of object keys
+        """
+        async with super().stream(method, path, **kwargs) as response:
+            match self.content_type(response.raise_for_status()):
+                case "json" if items is not None:
+                    parser = ItemParser(items)
+                    async for text in response.aiter_text():
+                        for item in parser.feed(text):
+                            yield item
+                    for item in parser.feed("", final=True):
+                        yield item
+                case "json":
+                    async for line in response.aiter_lines():
+                        yield self._loads(line)
+                case "text":
+                    async for line in response.aiter_lines():
+                        yield line
+                case _:
+                    async for chunk in response.aiter_bytes():
+                        yield chunk
+
+    __aiter__ = stream
+
+    async def download(self, file, path: str = "", chunk_size: int | None = None, **kwargs):
+        """Output streamed GET request to file, writing in a thread to not block the loop."""
+        async with super().stream("GET", path, **kwargs) as response:
+            async for chunk in response.raise_for_status().aiter_bytes(chunk_size):
+                await asyncio.to_thread(file.write, chunk)
+        return file
 
     async def updater(self, path="", **kwargs):
         response = (await super().request("GET", path, **kwargs)).raise_for_status()
         kwargs["headers"] = dict(kwargs.get("headers", {}), **validate(response))
-        yield await self.put(path, (yield response.json()), **kwargs)
+        yield await self.put(path, (yield self._loads(response.content)), **kwargs)
 
     @contextlib.asynccontextmanager
     async def updating(self, path: str = "", **kwargs):
@@ -59,12 +242,48 @@ class AsyncResource(AsyncClient):
         updater = self.updater(path)
         return await updater.asend(callback(await updater.__anext__(), **json))
 
-    async def authorize(self, path: str = "", **kwargs) -> dict:
-        """Acquire oauth access token and set `Authorization` header."""
+    async def _page(self, path: str, kwargs: dict) -> tuple:
+        response = (await super().request("GET", path, **kwargs)).raise_for_status()
+        return response, self._decode(response)
+
+    async def paginate(
+        self, path: str = "", pages: Pages | None = None, prefetch: bool = False, **kwargs
+    ) -> AsyncIterator:
+        """Iterate items across pages of GET requests.
+
+        Args:
+            pages: pagination strategy, which defaults to `Link` headers
+            prefetch: request the next page in a task while the current page is consumed
+        """
+        pages = pages or Pages()
+        request, task = (path, kwargs), None
+        page = await self._page(*request)
+        try:
+            while request := pages.next(*page, *request):
+                task = asyncio.ensure_future(self._page(*request)) if prefetch else None
+                for item in pages.select(page[1]):
+                    yield item
+                page = await (task or self._page(*request))
+            for item in pages.select(page[1]):
+                yield item
+        finally:
+            if task:
+                task.cancel()
+
+    async def authorize(self, path: str = "", refresh: float | None = None, **kwargs) -> dict:
+        """Acquire oauth access token and set `Authorization` header.
+
+        Args:
+            refresh: optionally set a [token][clients.base.Token] auth instead, which is refreshed
+                within seconds of expiry
+        """
         method = "GET" if {"json", "data"}.isdisjoint(kwargs) else "POST"
         result = await self.request(method, path, **kwargs)
-        self.headers["authorization"] = f"{result['token_type']} {result['access_token']}"
-        self._attrs["headers"] = self.headers
+        if refresh is None:
+            self.headers["authorization"] = f"{result['token_type']} {result['access_token']}"
+        else:
+            fetch = functools.partial(self.request, method, path, **({"auth": None} | kwargs))
+            self.auth = Token(fetch, result, refresh)
         return result
 
 
@@ -79,58 +298,202 @@ class AsyncRemote(AsyncClient):
 
     client = AsyncResource.client
     __getattr__ = AsyncResource.__getattr__
+    _fresh = Remote._fresh
     check = staticmethod(Remote.check)
 
     def __init__(self, url: str, json: Mapping = {}, **kwargs):
         super().__init__(url, **kwargs)
         self.json = dict(json)
 
-    @classmethod
-    def clone(cls, other, path=""):
-        return AsyncClient.clone.__func__(cls, other, path, json=other.json)
+    clone = classmethod(Remote.clone.__func__)
 
     async def __call__(self, path="", **json):
         """POST request with json body and check result."""
         response = (await self.post(path, json=dict(self.json, **json))).raise_for_status()
-        return self.check(response.json())
+        return self.check(self._loads(response.content))
+
+    @contextlib.asynccontextmanager
+    async def batch(self, path: str = "") -> AsyncIterator[Batch]:
+        """Context manager which collects calls and POSTs them as a json array on exit.
+
+        Calls return futures of checked results, matched by `id`, as in JSON-RPC batches.
+        """
+        batch = Batch(self.json, asyncio.get_running_loop().create_future)
+        yield batch
+        if batch:
+            response = (await self.post(path, json=batch)).raise_for_status()
+            batch.resolve(self._loads(response.content), self.check)
 
 
 class AsyncGraph(AsyncRemote):
-    """An `AsyncRemote` client which executes GraphQL queries."""
+    """An `AsyncRemote` client which executes GraphQL queries.
+
+    Args:
+        url: base url for requests
+        json: default json body for all calls
+        persisted: send query hashes first, i.e., automatic persisted queries
+        window: optionally coalesce queries executed within a window of seconds into batches
+        **kwargs: same options as `AsyncRemote`
+    """
 
     Error = httpx.HTTPError
-    execute = Graph.execute
     check = classmethod(Graph.check.__func__)
+    digest = staticmethod(Graph.digest)
+    missing = staticmethod(Graph.missing)
+    _body = Graph._body
+
+    def __init__(
+        self,
+        url: str,
+        json: Mapping = {},
+        *,
+        persisted: bool = False,
+        window: float = 0.0,
+        **kwargs,
+    ):
+        super().__init__(url, json, **kwargs)
+        self.persisted, self.window = persisted, window
+        self._pending: list = []
+
+    @classmethod
+    def clone(cls, other, path=""):
+        return AsyncRemote.clone.__func__(cls, other, path, _pending=[])
+
+    async def _post(self, json: dict | list):
+        return self._loads((await self.post("", json=json)).raise_for_status().content)
+
+    async def execute(self, query: str, **variables):
+        """Execute query over POST, with the hash first if persisted, or coalesced into a batch."""
+        if not self.window:
+            result = await self._post(self._body(query, variables))
+            if self.missing(result):
+                result = await self._post(self._body(query, variables, full=True))
+            return self.check(result)
+        if not self._pending:
+            self._batching = asyncio.ensure_future(self._flush())
+        index = len(self._pending)
+        self._pending.append((query, variables))
+        return self.check((await asyncio.shield(self._batching))[index])
+
+    async def _flush(self) -> list:
+        await asyncio.sleep(self.window)
+        pending, self._pending = self._pending, []
+        return await self._batch(pending)
+
+    async def _batch(self, operations: list) -> list:
+        results = await self._post([self._body(*operation) for operation in operations])
+        if missing := [index for index, result in enumerate(results) if self.missing(result)]:
+            bodies = [self._body(*operations[index], full=True) for index in missing]
+            for index, result in zip(missing, await self._post(bodies)):
+                results[index] = result
+        return results
+
+    async def execute_many(self, operations: Iterable[tuple[str, Mapping]]) -> list:
+        """Execute queries with variables in a single POST of a json array."""
+        return list(map(self.check, await self._batch(list(operations))))
+
+
+class AsyncStats(Stats):
+    """`Stats` for use within an event loop, without locking."""
+
+    add = Stats.record
 
 
 class AsyncProxy(AsyncClient):
     """An extensible embedded proxy client to multiple hosts.
 
     The default implementation provides load balancing based on active connections.
-    It does not provide error handling or retrying.
+    Error handling and failover are provided by an optional [retry][clients.base.Retry] policy,
+    and tail latency is reduced by an optional [hedge][clients.base.Hedge] policy.
 
     Args:
         *urls: base urls for requests
+        retry: optional retry policy
+        hedge: optional hedging policy
+        strategy: [choice][clients.base.Proxy.choice] strategy
+        weights: optional url weights for rotate and hash strategies
+        balance: load to minimize, either active `connections` or expected `latency`
+        pools: optional connection limits of separate pools by url, which mount default
+            transports, and so may not be combined with a custom `transport`
         **kwargs: same options as `AsyncClient`
     """
 
-    Stats = Proxy.Stats
+    Stats = AsyncStats
+    Transport = httpx.AsyncHTTPTransport
+    replicas = Proxy.replicas
     priority = Proxy.priority
     choice = Proxy.choice
+    alternate = Proxy.alternate
+    template = Proxy.template
+    hash = staticmethod(Proxy.hash)
+    _index = Proxy._index
+    _mount = classmethod(Proxy._mount.__func__)
 
-    def __init__(self, *urls: str, **kwargs):
-        super().__init__("https://proxies", **kwargs)
+    def __init__(
+        self,
+        *urls: str,
+        retry: Retry | None = None,
+        hedge: Hedge | None = None,
+        strategy: str = "priority",
+        weights: Mapping[str, int] = {},
+        balance: str = "connections",
+        pools: Mapping[str, httpx.Limits] = {},
+        **kwargs,
+    ):
+        super().__init__("https://proxies", **self._mount(pools, kwargs))
         self.urls = {(url.rstrip("/") + "/"): self.Stats() for url in urls}
+        self.retry, self.hedge, self.strategy, self.balance = retry, hedge, strategy, balance
+        self._index({url.rstrip("/") + "/": weight for url, weight in weights.items()})
 
-    @classmethod
-    def clone(cls, other, path=""):
-        urls = (urljoin(url, path) for url in other.urls)
-        return cls(*urls, trailing=other.trailing, **other._attrs)
+    clone = classmethod(Proxy.clone.__func__)
+
+    async def _attempt(self, url: str, method: str, path: str, kwargs: dict) -> httpx.Response:
+        joined = Joined(urljoin(url, path).rstrip("/") + self.trailing)
+        try:
+            with self.urls[url] as stats:
+                start = time.perf_counter()
+                response = await super().request(method, joined, **kwargs)
+            latency = time.perf_counter() - start
+            stats.add(failures=int(response.is_server_error), latency=latency)
+            return response
+        finally:
+            if self.hooks is not None:
+                self.hooks.proxied(url, self.urls[url])
+
+    async def _hedged(self, url: str, method: str, path: str, kwargs: dict) -> httpx.Response:
+        if self.hedge is None or (delay := self.hedge.wait(method, self.urls[url])) is None:
+            return await self._attempt(url, method, path, kwargs)
+        attempts = [asyncio.ensure_future(self._attempt(url, method, path, kwargs))]
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if not done and (other := self.alternate(url)) is not None and self.hedge.withdraw():
+                attempts.append(asyncio.ensure_future(self._attempt(other, method, path, kwargs)))
+            completed = asyncio.as_completed(attempts)
+            for attempt in itertools.islice(completed, len(attempts) - 1):
+                with contextlib.suppress(httpx.TransportError):
+                    return await attempt
+            return await next(completed)
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
 
     async def request(self, method, path, **kwargs):
-        """Send request with relative or absolute path and return response."""
-        url = self.choice(method)
-        with self.urls[url] as stats:
-            response = await super().request(method, urljoin(url, path), **kwargs)
-        stats.add(failures=int(response.status_code >= 500))
-        return response
+        """Send request with relative or absolute path and return response.
+
+        Failed requests are retried on the next chosen url, according to the retry policy.
+        Slow requests are hedged on the next best url, according to the hedge policy, and the
+        losing request is cancelled.
+        """
+        delays = self.retry.delays(method) if self.retry else iter(())
+        while True:
+            url = self.choice(method, path)
+            try:
+                response = await self._hedged(url, method, path, kwargs)
+            except httpx.TransportError:
+                if (delay := next(delays, None)) is None:
+                    raise
+            else:
+                retryable = self.retry and response.status_code in self.retry.statuses
+                if not retryable or (delay := next(delays, None)) is None:
+                    return response
+            await asyncio.sleep(delay)
@@ -1,31 +1,681 @@
+import asyncio
+import bisect
 import collections
 import contextlib
+import email.utils
 import functools
+import hashlib
+import itertools
 import json
+import math
+import mmap
+import os
+import pathlib
+import pickle
 import random
 import re
+import tempfile
 import threading
-from collections.abc import Callable, Iterator, Mapping
-from typing import Self
-from urllib.parse import urljoin
+import time
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from concurrent import futures
+from typing import NamedTuple, Self
+from urllib.parse import quote, urljoin
 
 import httpx2 as httpx
 
 
-def content_type(response, **patterns):
+def evict(cache: dict, maxsize: int):
+    """Remove oldest entries of an insertion-ordered cache beyond maxsize.
+
+    Concurrent threads may evict the same entries, so missing keys are ignored.
+    """
+    while len(cache) > maxsize:
+        with contextlib.suppress(RuntimeError):  # changed size during iteration
+            cache.pop(next(iter(cache), None), None)
+
+
+class ContentTypes:
+    """Registry of content types, with precompiled patterns and optional decoders.
+
+    Calling it returns the name of a response's content type, memoized by header value.
+
+    Args:
+        maxsize: maximum number of memoized header values
+        **patterns: names and regular expressions of content types
+    """
+
+    def __init__(self, maxsize: int = 256, **patterns: str):
+        self.maxsize, self.memo = maxsize, {}
+        self.patterns: dict[str, re.Pattern] = {}
+        self.decoders: dict[str, Callable[[bytes], object]] = {}
+        for name, pattern in patterns.items():
+            self.register(name, pattern)
+
+    def register(self, name: str, pattern: str, decoder: Callable[[bytes], object] | None = None):
+        """Register content type pattern, with an optional decoder of resource content."""
+        self.patterns[name] = re.compile(pattern)
+        if decoder is not None:
+            self.decoders[name] = decoder
+        self.memo.clear()
+
+    def copy(self) -> Self:
+        """Return a registry with the same patterns and decoders, and an empty memo."""
+        other = type(self)(self.maxsize)
+        other.patterns, other.decoders = dict(self.patterns), dict(self.decoders)
+        return other
+
+    def __call__(self, response) -> str:
+        ct = response.headers.get("content-type", "")
+        if (name := self.memo.get(ct)) is None:
+            matches = (name for name, pattern in self.patterns.items() if pattern.match(ct))
+            name = self.memo[ct] = next(matches, "")
+            evict(self.memo, self.maxsize)
+        return name
+
+
+def content_type(response, **patterns) -> str:
     """Return name for response's content-type based on regular expression matches."""
-    ct = response.headers.get("content-type", "")
-    matches = (name for name, pattern in patterns.items() if re.match(pattern, ct))
-    return next(matches, "")
+    return ContentTypes(**patterns)(response)
+
 
+def validate(response, etag="if-match", last_modified="if-unmodified-since"):
+    """Return validation headers from response translated for modification.
 
-def validate(response):
-    """Return validation headers from response translated for modification."""
+    The header names may be overridden for other conditional requests.
+    """
     headers = response.headers
-    validators = {"etag": "if-match", "last-modified": "if-unmodified-since"}
+    validators = {"etag": etag, "last-modified": last_modified}
     return {validators[key]: headers[key] for key in validators if key in headers}
 
 
+def freshness(response, shared: bool = False) -> float | None:
+    """Return seconds response is fresh for according to caching headers, or None if not storable.
+
+    Shared caches prefer `s-maxage`, and do not store private responses, nor responses to
+    authorized requests unless explicitly allowed.
+    """
+    headers = response.headers
+    directives = {}
+    for directive in headers.get("cache-control", "").lower().split(","):
+        name, _, value = directive.strip().partition("=")
+        directives[name] = value.strip('"')
+    if "no-store" in directives or headers.get("vary") == "*":
+        return None
+    if shared:
+        allowed = not directives.keys().isdisjoint({"public", "s-maxage", "must-revalidate"})
+        if "private" in directives or ("authorization" in response.request.headers and not allowed):
+            return None
+    if "no-cache" in directives:
+        return 0.0
+    with contextlib.suppress(ValueError):
+        for name in ("s-maxage", "max-age") if shared else ("max-age",):
+            if name in directives:
+                return float(directives[name]) - float(headers.get("age", 0))
+        if "expires" in headers:
+            expires = email.utils.parsedate_to_datetime(headers["expires"])
+            date = email.utils.parsedate_to_datetime(headers.get("date", headers["expires"]))
+            return (expires - date).total_seconds()
+    return 0.0
+
+
+def throttling(response) -> float | None:
+    """Return seconds to pause requests according to rate limit headers, or None."""
+    headers = response.headers
+    with contextlib.suppress(KeyError, ValueError):
+        if response.status_code in (429, 503) and "retry-after" in headers:
+            value = headers["retry-after"]
+            if value.isdigit():
+                return float(value)
+            return email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+        if headers.get("x-ratelimit-remaining") == "0":
+            reset = float(headers["x-ratelimit-reset"])
+            return reset - time.time() if reset > 1e9 else reset  # epoch or delta seconds
+    return None
+
+
+class Codec(NamedTuple):
+    """Json codec for request bodies and response content.
+
+    Any object with compatible `dumps` and `loads`, such as the `orjson` module, may also be used.
+    Typed decoding is supported by the `loads` function, e.g., `msgspec.json.Decoder(type).decode`.
+    """
+
+    dumps: Callable[[object], bytes | str]
+    loads: Callable[[bytes | str], object]
+
+
+class Cached(NamedTuple):
+    """Decoded content of a cached response."""
+
+    content: object
+    expires: float
+    validators: dict
+    vary: dict
+    size: int
+
+
+class Cache:
+    """LRU cache of decoded responses, evicted by size of content.
+
+    Assign to `Resource.cache` to cache GET requests according to `Cache-Control`, and to
+    revalidate stale responses with `ETag` and `Last-Modified`. Cached content is shared, and
+    should be treated as immutable.
+
+    Args:
+        maxsize: maximum total bytes of cached content
+    """
+
+    shared = False  # whether to follow the storage rules of shared caches
+
+    def __init__(self, maxsize: int = 2**26):
+        self.maxsize, self.size = maxsize, 0
+        self.entries: collections.OrderedDict = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Cached | None:
+        """Return entry and mark as recently used."""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+            return self.entries.get(key)
+
+    def set(self, key: str, entry: Cached):
+        """Store entry and evict least recently used entries."""
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entries.pop(key).size
+            if entry.size <= self.maxsize:
+                self.entries[key] = entry
+                self.size += entry.size
+            while self.size > self.maxsize:
+                self.size -= self.entries.popitem(last=False)[1].size
+
+
+class DiskCache(Cache):
+    """A `Cache` which pickles entries to files in a directory.
+
+    Files are evicted by least recent modification, so the directory may be shared by processes.
+    The directory must be trusted, as entries are unpickled. As a shared cache, private responses
+    and responses to authorized requests are not stored, unless marked `public`.
+
+    Args:
+        path: directory for cached files
+        maxsize: maximum total bytes of cached files
+    """
+
+    shared = True
+
+    def __init__(self, path: str | os.PathLike, maxsize: int = 2**30):
+        super().__init__(maxsize)
+        self.path = pathlib.Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.size = sum(file.stat().st_size for file in self.path.iterdir())
+
+    def file(self, key: str) -> pathlib.Path:
+        return self.path / hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key: str) -> Cached | None:
+        """Return entry and mark as recently used."""
+        file = self.file(key)
+        try:
+            entry = pickle.loads(file.read_bytes())
+            os.utime(file)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        return entry
+
+    def set(self, key: str, entry: Cached):
+        """Store entry and evict least recently used files."""
+        with tempfile.NamedTemporaryFile(dir=self.path, delete=False) as temp:
+            pickle.dump(entry, temp)
+        size = os.path.getsize(temp.name)
+        with self.lock:
+            with contextlib.suppress(OSError):
+                self.size -= self.file(key).stat().st_size
+            os.replace(temp.name, self.file(key))
+            self.size += size
+            if self.size > self.maxsize:
+                self.evict()
+
+    def evict(self):
+        stats = []
+        for file in self.path.iterdir():
+            with contextlib.suppress(OSError):
+                stats.append((file.stat(), file))
+        stats.sort(key=lambda item: item[0].st_mtime)
+        self.size = sum(stat.st_size for stat, _ in stats)
+        for stat, file in stats:
+            if self.size <= self.maxsize:
+                break
+            with contextlib.suppress(OSError):
+                file.unlink()
+                self.size -= stat.st_size
+
+
+class SingleFlight:
+    """In-flight GET requests, which concurrent identical requests wait on.
+
+    Assign to `Resource.flights` to coalesce GET requests by url, params, and selected headers.
+    Results are shared, and should be treated as immutable.
+
+    Args:
+        headers: names of headers which also distinguish requests
+    """
+
+    def __init__(self, headers: Iterable[str] = ()):
+        self.headers = tuple(headers)
+        self.flights: dict = {}
+        self.lock = threading.Lock()
+
+    def call(self, key: tuple, func: Callable, *args):
+        """Return result of function, or wait on the in-flight call with the same key."""
+        with self.lock:
+            future = self.flights.get(key)
+            if leader := future is None:
+                future = self.flights[key] = futures.Future()
+        if not leader:
+            return future.result()
+        try:
+            future.set_result(func(*args))
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+        return future.result()
+
+    async def acall(self, key: tuple, func: Callable, *args):
+        """Await result of coroutine function, or the in-flight task with the same key."""
+        if (task := self.flights.get(key)) is None:
+            task = self.flights[key] = asyncio.ensure_future(func(*args))
+            task.add_done_callback(lambda _: self.flights.pop(key))
+        return await asyncio.shield(task)
+
+
+class ItemParser:
+    """Incremental parser of the items of a json array, from streamed text.
+
+    Memory is bounded by the size of an item, rather than the whole document.
+
+    Args:
+        keys: path of object keys to the array
+    """
+
+    decoder = json.JSONDecoder()
+    separators = re.compile(r"[\s,]*")
+    terminators = frozenset(" \t\r\n,:]}")
+
+    def __init__(self, keys: Iterable[str] = ()):
+        self.keys = list(keys)
+        self.buffer, self.pos, self.need = "", 0, 0
+        self.state = "seek"
+
+    def skip(self, final: bool) -> str:
+        self.pos = self.separators.match(self.buffer, self.pos).end()  # type: ignore
+        if self.pos < len(self.buffer):
+            return self.buffer[self.pos]
+        if final:
+            raise json.JSONDecodeError("Unexpected end of data", self.buffer, self.pos)
+        raise EOFError
+
+    def decode(self, final: bool):
+        try:
+            value, end = self.decoder.raw_decode(self.buffer, self.pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            raise EOFError from None
+        if not final and self.buffer[end : end + 1] not in self.terminators:
+            raise EOFError  # numbers may be incomplete
+        self.pos = end
+        return value
+
+    def step(self, items: list, final: bool):
+        match self.state, self.skip(final):
+            case "seek", "{" if self.keys:
+                self.pos, self.state = self.pos + 1, "keys"
+            case "seek", "[" if not self.keys:
+                self.pos, self.state = self.pos + 1, "items"
+            case ("keys", "}") | ("items", "]"):
+                self.state = "done"
+            case "keys", '"':
+                key = self.decode(final)
+                if self.skip(final) != ":":
+                    raise json.JSONDecodeError("Expecting ':'", self.buffer, self.pos)
+                self.pos += 1
+                if key == self.keys[0]:
+                    self.keys.pop(0)
+                    self.state = "seek"
+                else:
+                    self.skip(final)
+                    self.decode(final)
+            case "items", _:
+                items.append(self.decode(final))
+            case _:
+                raise json.JSONDecodeError("Unexpected value", self.buffer, self.pos)
+
+    def feed(self, text: str, final: bool = False) -> list:
+        """Add text and return parsed items, where `final` indicates the end of the stream."""
+        self.buffer = self.buffer[self.pos :] + text
+        self.pos, items = 0, []
+        if len(self.buffer) < self.need and not final:
+            return items
+        while self.state != "done":
+            start = self.pos
+            try:
+                self.step(items, final)
+            except EOFError:  # wait for at least twice the text to avoid reparsing
+                self.pos, self.need = start, 2 * (len(self.buffer) - start)
+                break
+        return items
+
+
+class Pages:
+    """Pagination by `Link` headers with `rel="next"`, and base class for pagination strategies.
+
+    Args:
+        items: key of items in the json content, otherwise the content is the list of items
+    """
+
+    def __init__(self, items: str = ""):
+        self.items = items
+
+    def select(self, data) -> list:
+        """Return items from json content."""
+        return data[self.items] if self.items else data
+
+    def next(self, response, data, path: str, kwargs: dict) -> tuple | None:
+        """Return path and request options for the next page, or None."""
+        url = response.links.get("next", {}).get("url")
+        return url and (url, {key: kwargs[key] for key in kwargs if key != "params"})
+
+
+class CursorPages(Pages):
+    """Pagination by a cursor in the json content, sent as a param.
+
+    Args:
+        cursor: dotted key of the next cursor in the json content
+        param: name of the cursor param
+        items: key of items in the json content
+    """
+
+    def __init__(self, cursor: str = "next_cursor", param: str = "cursor", items: str = ""):
+        super().__init__(items)
+        self.cursor, self.param = cursor, param
+
+    def next(self, response, data, path: str, kwargs: dict) -> tuple | None:
+        for key in self.cursor.split("."):
+            data = data.get(key) if isinstance(data, Mapping) else None
+        params = dict(kwargs.get("params") or {}, **{self.param: data})
+        return data and (path, kwargs | {"params": params})
+
+
+class OffsetPages(Pages):
+    """Pagination by an offset param, until a page has fewer than `limit` items.
+
+    Args:
+        param: name of the offset param
+        limit: page size; by default pagination stops at an empty page
+        items: key of items in the json content
+    """
+
+    def __init__(self, param: str = "offset", limit: int = 1, items: str = ""):
+        super().__init__(items)
+        self.param, self.limit = param, limit
+
+    def next(self, response, data, path: str, kwargs: dict) -> tuple | None:
+        count = len(self.select(data))
+        params = dict(kwargs.get("params") or {})
+        params[self.param] = int(params.get(self.param, 0)) + count
+        return (path, kwargs | {"params": params}) if count >= self.limit else None
+
+
+class Batch(list):
+    """Json bodies of calls to send as an array, with futures of results matched by `id`."""
+
+    def __init__(self, json: Mapping, future: Callable = futures.Future):
+        self.json, self.future, self.futures = json, future, {}
+
+    def __call__(self, **json):
+        """Add call with json body and return a future of its result.
+
+        The `id` defaults to the index of the call, and must be unique.
+        """
+        body = {**self.json, "id": len(self), **json}
+        if body["id"] in self.futures:
+            raise ValueError(f"duplicate id: {body['id']}")
+        self.append(body)
+        future = self.futures[body["id"]] = self.future()
+        return future
+
+    def resolve(self, results: list | dict, check: Callable):
+        """Set checked results, or errors, on futures in order of calls.
+
+        A single result, e.g., an error for an invalid batch, applies to all calls.
+        """
+        if not isinstance(results, list):
+            results = [dict(results, id=id) for id in self.futures]
+        results = {result.get("id"): result for result in results}
+        for id, future in self.futures.items():
+            try:
+                future.set_result(check(results[id]))
+            except Exception as exc:  # noqa: BLE001
+                future.set_exception(exc)
+
+
+class Token(httpx.Auth):
+    """Auth with an oauth access token, which is refreshed before it expires and on `401`.
+
+    A stale token is refreshed by the first request within the margin of expiry, while concurrent
+    requests continue with the current token. Once expired, requests wait on a single refresh.
+    Clones share the auth, and therefore the refreshed token.
+
+    Args:
+        fetch: callable which returns a new token result, or a coroutine for async clients
+        result: current token result with `access_token`, `token_type`, and `expires_in`
+        margin: seconds before expiry to refresh the token
+    """
+
+    def __init__(self, fetch: Callable, result: Mapping, margin: float = 60.0):
+        self.fetch, self.margin = fetch, margin
+        self.lock, self.alock = threading.Lock(), asyncio.Lock()
+        self.update(result)
+
+    def update(self, result: Mapping):
+        """Set authorization header and expiration from token result."""
+        self.header = f"{result['token_type']} {result['access_token']}"
+        self.expires = time.time() + float(result.get("expires_in", math.inf))
+
+    def refresh(self, header: str, blocking: bool = True):
+        """Fetch a new token unless the header has already been refreshed."""
+        if self.lock.acquire(blocking=blocking):
+            try:
+                if self.header == header:
+                    self.update(self.fetch())
+            finally:
+                self.lock.release()
+
+    async def arefresh(self, header: str, blocking: bool = True):
+        """Await a new token unless the header has already been refreshed."""
+        if blocking or not self.alock.locked():
+            async with self.alock:
+                if self.header == header:
+                    self.update(await self.fetch())
+
+    def sync_auth_flow(self, request):
+        if self.expires - self.margin <= time.time():
+            self.refresh(self.header, blocking=self.expires <= time.time())
+        request.headers["authorization"] = header = self.header
+        if (yield request).status_code == 401:
+            self.refresh(header)
+            request.headers["authorization"] = self.header
+            yield request
+
+    async def async_auth_flow(self, request):
+        if self.expires - self.margin <= time.time():
+            await self.arefresh(self.header, blocking=self.expires <= time.time())
+        request.headers["authorization"] = header = self.header
+        if (yield request).status_code == 401:
+            await self.arefresh(header)
+            request.headers["authorization"] = self.header
+            yield request
+
+
+class Limiter:
+    """Rate and concurrency limiter, which adapts to rate limit headers.
+
+    Assign to `BaseClient.limiter` to pace requests with a token bucket, and to limit requests in
+    flight. `Retry-After` on throttled responses, or an exhausted `X-RateLimit-Remaining`, pause
+    requests until the indicated time. Adaptive concurrency increases the limit additively on
+    success, and decreases it multiplicatively on throttling, i.e., AIMD.
+
+    Args:
+        rate: requests per second
+        burst: maximum requests at once, i.e., capacity of the bucket
+        concurrency: maximum requests in flight
+        adaptive: adjust the concurrency limit between 1 and the maximum, which must be finite
+    """
+
+    def __init__(
+        self,
+        rate: float = math.inf,
+        burst: int = 1,
+        concurrency: float = math.inf,
+        adaptive: bool = False,
+    ):
+        if adaptive and concurrency == math.inf:
+            raise ValueError("adaptive concurrency requires a finite `concurrency` limit")
+        self.rate, self.burst, self.concurrency, self.adaptive = rate, burst, concurrency, adaptive
+        self.tokens, self.limit, self.active = float(burst), concurrency, 0
+        self.updated = self.resumes = time.monotonic()
+        self.lock = threading.Lock()
+        self.condition, self.acondition = threading.Condition(self.lock), asyncio.Condition()
+
+    def reserve(self) -> float:
+        """Take a token and return seconds to wait for it."""
+        with self.lock:
+            now = time.monotonic()
+            delay = self.resumes - now
+            if self.rate < math.inf:
+                elapsed, self.updated = now - self.updated, now
+                self.tokens = min(self.burst, self.tokens + elapsed * self.rate) - 1
+                delay = max(delay, -self.tokens / self.rate)
+            return max(delay, 0.0)
+
+    def observe(self, response: httpx.Response | None):
+        """Adapt to throttling and rate limit headers of response."""
+        if response is None:
+            return
+        throttled = response.status_code in (429, 503)
+        seconds = throttling(response)
+        with self.lock:
+            if seconds is not None:
+                self.resumes = max(self.resumes, time.monotonic() + seconds)
+            if self.adaptive and throttled:
+                self.limit = max(self.limit / 2, 1.0)
+            elif self.adaptive:
+                self.limit = min(self.limit + 1 / self.limit, self.concurrency)
+
+    def acquire(self):
+        """Wait for a token and a slot in flight."""
+        time.sleep(self.reserve())
+        with self.condition:
+            self.condition.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+
+    def release(self, response: httpx.Response | None = None):
+        """Release slot in flight and adapt to response."""
+        self.observe(response)
+        with self.condition:
+            self.active -= 1
+            self.condition.notify_all()
+
+    async def aacquire(self):
+        """Await a token and a slot in flight."""
+        await asyncio.sleep(self.reserve())
+        async with self.acondition:
+            await self.acondition.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+
+    async def arelease(self, response: httpx.Response | None = None):
+        """Release slot in flight and adapt to response."""
+        self.observe(response)
+        async with self.acondition:
+            self.active -= 1
+            self.acondition.notify_all()
+
+
+class Timings(dict):
+    """Record of request timings in seconds, by phase.
+
+    Connection phases are traced by transports which support the `trace` extension, e.g.,
+    `connect_tcp`, `start_tls`, `receive_response_headers`, and `receive_response_body`.
+    """
+
+    def __init__(self):
+        self.starts: dict = {}
+
+    def trace(self, name: str, info: dict):
+        """Record phase from trace event."""
+        prefix, _, event = name.rpartition(".")
+        phase = prefix.rpartition(".")[2]
+        if event == "started":
+            self.starts[phase] = time.perf_counter()
+        else:
+            self[phase] = self.get(phase, 0.0) + time.perf_counter() - self.starts.pop(phase)
+
+    async def atrace(self, name: str, info: dict):
+        """Record phase from async trace event."""
+        self.trace(name, info)
+
+    @contextlib.contextmanager
+    def time(self, phase: str):
+        """Context manager to record phase."""
+        self.trace(f"{phase}.started", {})
+        try:
+            yield self
+        finally:
+            self.trace(f"{phase}.complete", {})
+
+
+class Hooks:
+    """Instrumentation callbacks, with a timing breakdown of requests.
+
+    Assign to `BaseClient.hooks`, and override methods to export metrics, e.g., to histograms or
+    spans. Requests are only traced and timed when hooks are set.
+    """
+
+    def before(self, request: httpx.Request):
+        """Called before sending request."""
+
+    def after(self, request: httpx.Request, response: httpx.Response | None, timings: Timings):
+        """Called after sending request, with the response or None on error.
+
+        Timings include `send`, which excludes streamed content, and `wait` for a limiter.
+        """
+
+    def decoded(self, response: httpx.Response, seconds: float):
+        """Called after resource content is decoded."""
+
+    def proxied(self, url: str, stats):
+        """Called after a proxy request, with the url's [stats][clients.base.Stats]."""
+
+
+def pool(transport) -> dict:
+    """Return counts of idle, active, and waiting connections in a transport's pool."""
+    pool = getattr(transport, "_pool", None)
+    connections = getattr(pool, "connections", ())
+    idle = sum(connection.is_idle() for connection in connections)
+    waiting = sum(request.is_queued() for request in getattr(pool, "_requests", ()))
+    return {"idle": idle, "active": len(connections) - idle, "waiting": waiting}
+
+
+class Joined(str):
+    """A url which has already been joined with the base url, and is used as is."""
+
+
 class BaseClient:
     """Client mixin.
 
@@ -35,10 +685,18 @@ class BaseClient:
         **attrs: additional Session attributes
     """
 
+    max_views = 128  # bounded cache of attribute views
+    max_urls = 1024  # bounded cache of joined urls
+    limiter: Limiter | None = None
+    codec: Codec | None = None
+    hooks: Hooks | None = None
+    _view = False  # views share the transport, which only the original closes
+
     def __init__(self, url: str, *, trailing: str = "", **attrs):
         super().__init__(base_url=url.rstrip("/") + "/", **attrs)  # type: ignore
-        self._attrs = attrs
         self.trailing = trailing
+        self._views: dict = {}
+        self._urls: tuple = None, trailing, {}
 
     def __repr__(self):
         return f"{type(self).__name__}({self.url}... {self.trailing})"
@@ -53,13 +711,65 @@ class BaseClient:
 
     @classmethod
     def clone(cls, other, path="", **kwargs):
-        url = str(other.base_url.join(path))
-        return cls(url, trailing=other.trailing, **(other._attrs | kwargs))
+        """Return a view of client with appended path.
+
+        The view shares the transport, connection pool, headers, and cookies of the original.
+        It can be opened and closed independently, without closing the shared transport.
+        """
+        self = cls.__new__(cls)
+        self.__dict__.update(other.__dict__, **kwargs)
+        self.base_url = other.base_url.join(path)  # type: ignore
+        self._views, self._urls = {}, (None, self.trailing, {})
+        self._parent_url, self._view = other.base_url, True
+        self._state = httpx._client.ClientState.UNOPENED
+        return self
+
+    def _url(self, path: str) -> str:
+        """Return url joined with base url and trailing chars, cached by path."""
+        if isinstance(path, Joined):
+            return path
+        base, trailing, urls = self._urls
+        if base is not self.base_url or trailing != self.trailing:  # type: ignore
+            base, trailing, urls = self._urls = self.base_url, self.trailing, {}  # type: ignore
+        if (url := urls.get(path)) is None:
+            url = urls[path] = Joined(str(base.join(path)).rstrip("/") + trailing)
+            evict(urls, self.max_urls)
+        return url
+
+    def template(self, path: str) -> Callable[..., str]:
+        """Return function which formats a path template with `{name}` fields.
+
+        The template is joined once, and values are quoted when formatted.
+        """
+        url = self._url(path).replace("%7B", "{").replace("%7D", "}")
+
+        def format(**fields) -> str:
+            return Joined(url.format_map({key: quote(str(fields[key]), safe="") for key in fields}))
+
+        return format
+
+    def pools(self) -> dict:
+        """Return [pool][clients.base.pool] stats of mounted and default transports by pattern."""
+        transports = {key.pattern: value for key, value in self._mounts.items()}  # type: ignore
+        transports.setdefault("all://", self._transport)  # type: ignore
+        return {name: pool(value) for name, value in transports.items() if value is not None}
+
+    def _encode(self, kwargs: dict) -> dict:
+        if self.codec is not None and kwargs.get("json") is not None:
+            headers = httpx.Headers(kwargs.get("headers"))
+            headers.setdefault("content-type", "application/json")
+            kwargs |= {"content": self.codec.dumps(kwargs.pop("json")), "headers": headers}
+        return kwargs
+
+    def _loads(self, content: bytes | str):
+        return (self.codec or json).loads(content)
 
     def request(self, method, path, **kwargs):
-        """Send request with relative or absolute path and return response."""
-        url = str(self.base_url.join(path)).rstrip("/") + self.trailing  # type: ignore
-        return super().request(method, url, **kwargs)  # type: ignore
+        """Send request with relative or absolute path and return response.
+
+        Json bodies are encoded with the optional [codec][clients.base.Codec].
+        """
+        return super().request(method, self._url(path), **self._encode(kwargs))  # type: ignore
 
     def get(self, path="", **kwargs):
         """GET request with optional path."""
@@ -91,40 +801,194 @@ class BaseClient:
 
 
 class Client(BaseClient, httpx.Client):
+    def close(self):
+        """Close transport and mounts, unless this is a view."""
+        if self._view:
+            self._state = httpx._client.ClientState.CLOSED
+        else:
+            super().close()
+
+    def __exit__(self, *args):
+        if self._view:
+            self._state = httpx._client.ClientState.CLOSED
+        else:
+            super().__exit__(*args)
+
+    def send(self, request, **kwargs):
+        """Send request with the optional [hooks][clients.base.Hooks]."""
+        if self.hooks is None:
+            return super().send(request, **kwargs)
+        timings, response = Timings(), None
+        request.extensions |= {"trace": timings.trace, "timings": timings}
+        self.hooks.before(request)
+        try:
+            with timings.time("send"):
+                response = super().send(request, **kwargs)
+        finally:
+            self.hooks.after(request, response, timings)
+        return response
+
+    def _send_single_request(self, request):
+        """Send each request of auth flows and redirects with the optional limiter.
+
+        Limiting single requests allows auth flows to make their own requests, e.g., to refresh
+        a token, without holding a slot.
+        """
+        if self.limiter is None:
+            return super()._send_single_request(request)
+        timings, response = request.extensions.get("timings"), None
+        with timings.time("wait") if timings is not None else contextlib.nullcontext():
+            self.limiter.acquire()
+        try:
+            response = super()._send_single_request(request)
+        finally:
+            self.limiter.release(response)
+        return response
+
     def stream(self, method, path, **kwargs):
         """Send request with relative or absolute path and stream response."""
-        url = str(self.base_url.join(path)).rstrip("/") + self.trailing
-        return super().stream(method, url, **kwargs)
+        return super().stream(method, self._url(path), **self._encode(kwargs))
+
+    def _fetch(self, item, return_exceptions: bool) -> tuple:
+        try:
+            return item, (self.get(params=item) if isinstance(item, Mapping) else self.get(item))
+        except Exception as exc:
+            if not return_exceptions:
+                raise
+            return item, exc
+
+    def map(
+        self, items: Iterable, limit: int = 10, ordered: bool = True, return_exceptions=False
+    ) -> Iterator:
+        """Concurrently GET paths or params with a thread pool, sharing the connection pool.
+
+        Args:
+            items: paths, or mappings of params
+            limit: maximum number of concurrent requests
+            ordered: yield results in order, or `(item, result)` pairs as completed
+            return_exceptions: yield exceptions as results instead of raising
+        """
+        executor = futures.ThreadPoolExecutor(limit)
+        try:
+            pending = [executor.submit(self._fetch, item, return_exceptions) for item in items]
+            for future in pending if ordered else futures.as_completed(pending):
+                item, result = future.result()
+                yield result if ordered else (item, result)
+        finally:
+            executor.shutdown(cancel_futures=True)
 
 
 class Resource(Client):
-    """A `Client` which returns json content and has syntactic support for requests."""
+    """A `Client` which returns json content and has syntactic support for requests.
+
+    Each resource copies the `content_type` registry, so registered types are shared only with
+    its views.
+    """
 
     client = property(Client.clone, doc="upcasted `Client`")
     __getitem__ = Client.get
     __setitem__ = Client.put
     __delitem__ = Client.delete
-    __getattr__ = Client.__truediv__
-    content_type = staticmethod(
-        functools.partial(content_type, text="text/", json=r"application/(\w|\.)*\+?json")
-    )
+    content_type = ContentTypes(text="text/", json=r"application/(\w|\.)*\+?json")
+    cache: Cache | None = None
+    flights: SingleFlight | None = None
 
-    def request(self, method, path, **kwargs):
-        """Send request with path and return processed content."""
-        response = super().request(method, path, **kwargs).raise_for_status()
-        match self.content_type(response):
+    def __init__(self, url: str, **kwargs):
+        super().__init__(url, **kwargs)
+        if isinstance(self.content_type, ContentTypes):
+            self.content_type = self.content_type.copy()
+
+    def _decode(self, response):
+        if self.hooks is None:
+            return self._content(response)
+        start = time.perf_counter()
+        content = self._content(response)
+        self.hooks.decoded(response, time.perf_counter() - start)
+        return content
+
+    def _content(self, response):
+        match name := self.content_type(response):
             case "json":
-                return response.json()
+                return self._loads(response.content)
             case "text":
                 return response.text
-        return response.content
+        decoder = getattr(self.content_type, "decoders", {}).get(name)
+        return response.content if decoder is None else decoder(response.content)
+
+    def _key(self, path, kwargs) -> str:
+        url = httpx.URL(self._url(path))
+        return str(url.copy_merge_params(self.params.merge(kwargs.get("params"))))
+
+    def _flight(self, path, kwargs) -> tuple:
+        headers = httpx.Headers(self.headers)
+        headers.update(kwargs.get("headers") or {})
+        return self._key(path, kwargs), *map(headers.get, self.flights.headers)  # type: ignore
+
+    def _lookup(self, path, kwargs) -> tuple[str, Cached | None]:
+        key = self._key(path, kwargs)
+        entry = self.cache.get(key)  # type: ignore
+        if entry and entry.vary:
+            headers = httpx.Headers(self.headers)
+            headers.update(kwargs.get("headers") or {})
+            if any(headers.get(name) != value for name, value in entry.vary.items()):
+                entry = None
+        if entry and entry.expires <= time.time():
+            kwargs["headers"] = dict(kwargs.get("headers") or {}, **entry.validators)
+        return key, entry
+
+    def _store(self, key: str, entry: Cached | None, response):
+        if entry and response.status_code == 304:
+            content, size = entry.content, entry.size
+        else:
+            content, size = self._decode(response.raise_for_status()), len(response.content)
+        seconds = freshness(response, self.cache.shared)  # type: ignore
+        validators = validate(response, "if-none-match", "if-modified-since")
+        if entry and not validators:
+            validators = entry.validators
+        if seconds is not None and (seconds > 0 or validators):
+            names = filter(None, map(str.strip, response.headers.get("vary", "").split(",")))
+            vary = {name: response.request.headers.get(name) for name in names}
+            entry = Cached(content, time.time() + seconds, validators, vary, size)
+            self.cache.set(key, entry)  # type: ignore
+        return content
+
+    def request(self, method, path, **kwargs):
+        """Send request with path and return processed content.
+
+        GET requests use the optional [cache][clients.base.Cache], and are optionally
+        [coalesced][clients.base.SingleFlight].
+        """
+        if method != "GET":
+            return self._decode(super().request(method, path, **kwargs).raise_for_status())
+        if self.flights is None:
+            return self._get(path, kwargs)
+        return self.flights.call(self._flight(path, kwargs), self._get, path, kwargs)
+
+    def _get(self, path: str, kwargs: dict):
+        if self.cache is None:
+            return self._decode(super().request("GET", path, **kwargs).raise_for_status())
+        key, entry = self._lookup(path, kwargs)
+        if entry and entry.expires > time.time():
+            return entry.content
+        return self._store(key, entry, super().request("GET", path, **kwargs))
+
+    def stream(
+        self, method: str = "GET", path: str = "", items: Iterable[str] | None = None, **kwargs
+    ) -> Iterator:
+        """Iterate lines or chunks from streamed request.
 
-    def stream(self, method: str = "GET", path: str = "", **kwargs) -> Iterator:
-        """Iterate lines or chunks from streamed request."""
+        Args:
+            items: optionally iterate items of a json array, at a path of object keys
+        """
         with super().stream(method, path, **kwargs) as response:
             match self.content_type(response.raise_for_status()):
+                case "json" if items is not None:
+                    parser = ItemParser(items)
+                    for text in response.iter_text():
+                        yield from parser.feed(text)
+                    yield from parser.feed("", final=True)
                 case "json":
-                    yield from map(json.loads, response.iter_lines())
+                    yield from map(self._loads, response.iter_lines())
                 case "text":
                     yield from response.iter_lines()
                 case _:
@@ -132,6 +996,27 @@ class Resource(Client):
 
     __iter__ = stream
 
+    def __getattr__(self, name: str) -> Self:
+        """Return a cached view with appended path.
+
+        Views are recreated if the `auth`, `headers`, `base_url`, or `trailing` have been
+        reassigned, or if a remote's `json` has changed.
+        """
+        view = self._views.pop(name, None)
+        if view is None or not self._fresh(view):
+            view = type(self).clone(self, name)
+        self._views[name] = view
+        evict(self._views, self.max_views)
+        return view
+
+    def _fresh(self, view) -> bool:
+        return (
+            view._auth is self._auth
+            and view.headers is self.headers
+            and view._parent_url is self.base_url
+            and view.trailing == self.trailing
+        )
+
     def __contains__(self, path: str):
         """Return whether endpoint exists according to HEAD request."""
         return not super().request("HEAD", path).is_error
@@ -143,7 +1028,7 @@ class Resource(Client):
     def updater(self, path="", **kwargs):
         response = super().request("GET", path, **kwargs).raise_for_status()
         kwargs["headers"] = dict(kwargs.get("headers", {}), **validate(response))
-        yield self.put(path, (yield response.json()), **kwargs)
+        yield self.put(path, (yield self._loads(response.content)), **kwargs)
 
     @contextlib.contextmanager
     def updating(self, path: str = "", **kwargs):
@@ -171,17 +1056,115 @@ class Resource(Client):
         response = super().request("POST", path, json=json, **kwargs).raise_for_status()
         return response.headers.get("location")
 
-    def download(self, file, path: str = "", **kwargs):
-        """Output streamed GET request to file."""
-        for chunk in self.stream(path=path, **kwargs):
-            file.write(chunk)
+    def download(self, file, path: str = "", parts: int = 1, validator: str = "", **kwargs):
+        """Output streamed GET request to file.
+
+        Args:
+            parts: number of concurrent range requests, if the server accepts byte ranges.
+                The file must be opened for update in binary mode. Ranges are conditional on the
+                resource being unchanged, with `If-Range`. On errors, the file is truncated to
+                the contiguous downloaded size.
+            validator: strong `ETag`, or else `Last-Modified`, of the resource when the file was
+                partially downloaded, which is required to resume from the file's current size.
+                Otherwise, or if the resource has changed, the file is downloaded again.
+        """
+        headers = {}
+        if parts > 1:
+            headers = super().request("HEAD", path, **kwargs).raise_for_status().headers
+        ranged = headers.get("accept-ranges") == "bytes" and "content-length" in headers
+        if not ranged or "content-encoding" in headers:
+            for chunk in self.stream(path=path, **kwargs):
+                file.write(chunk)
+            return file
+        total, stream = int(headers["content-length"]), super().stream
+        etag = headers.get("etag", "")
+        current = etag if etag[:1] == '"' else headers.get("last-modified", "")  # strong etags
+        start = file.seek(0, os.SEEK_END)
+        if start > total or not validator or validator != current:
+            start = file.truncate(0)  # changed, or unverifiable, content is not resumed
+        if start == total:
+            return file
+        conditions = {"if-range": current} if current else {}
+        size = -(-(total - start) // parts)
+        ranges = [(offset, min(offset + size, total)) for offset in range(start, total, size)]
+        written = [0] * len(ranges)
+
+        def fetch(index: int):
+            begin, end = ranges[index]
+            headers = dict(kwargs.get("headers") or {}, range=f"bytes={begin}-{end - 1}")
+            with stream("GET", path, **(kwargs | {"headers": headers | conditions})) as response:
+                if response.raise_for_status().status_code != 206:
+                    reason = "Resource changed or range ignored" if conditions else "Range ignored"
+                    raise httpx.RemoteProtocolError(reason, request=response.request)
+                for chunk in response.iter_bytes():
+                    offset = begin + written[index]
+                    buffer[offset : offset + len(chunk)] = chunk
+                    written[index] += len(chunk)
+            if written[index] != end - begin:
+                raise httpx.RemoteProtocolError("Incomplete range", request=response.request)
+
+        file.truncate(total)
+        buffer = mmap.mmap(file.fileno(), total)
+        executor = futures.ThreadPoolExecutor(parts)
+        try:
+            for future in [executor.submit(fetch, index) for index in range(len(ranges))]:
+                future.result()
+        except BaseException:
+            executor.shutdown(cancel_futures=True)
+            offsets = (begin + count for (begin, _), count in zip(ranges, written))
+            start = next(
+                (offset for offset, (_, end) in zip(offsets, ranges) if offset < end), total
+            )
+            buffer.close()
+            file.truncate(start)
+            raise
+        executor.shutdown()
+        buffer.close()
+        file.seek(total)
         return file
 
-    def authorize(self, path: str = "", **kwargs) -> dict:
-        """Acquire oauth access token and set `Authorization` header."""
+    def _page(self, path: str, kwargs: dict) -> tuple:
+        response = super().request("GET", path, **kwargs).raise_for_status()
+        return response, self._decode(response)
+
+    def paginate(
+        self, path: str = "", pages: Pages | None = None, prefetch: bool = False, **kwargs
+    ) -> Iterator:
+        """Iterate items across pages of GET requests.
+
+        Args:
+            pages: pagination strategy, which defaults to `Link` headers
+            prefetch: request the next page in a thread while the current page is consumed
+        """
+        pages = pages or Pages()
+        executor = futures.ThreadPoolExecutor(1) if prefetch else None
+        request = path, kwargs
+        page = self._page(*request)
+        try:
+            while request := pages.next(*page, *request):
+                if executor:
+                    future = executor.submit(self._page, *request)
+                yield from pages.select(page[1])
+                page = future.result() if executor else self._page(*request)
+            yield from pages.select(page[1])
+        finally:
+            if executor:
+                executor.shutdown(cancel_futures=True)
+
+    def authorize(self, path: str = "", refresh: float | None = None, **kwargs) -> dict:
+        """Acquire oauth access token and set `Authorization` header.
+
+        Args:
+            refresh: optionally set a [token][clients.base.Token] auth instead, which is refreshed
+                within seconds of expiry
+        """
         method = "GET" if {"json", "data"}.isdisjoint(kwargs) else "POST"
         result = self.request(method, path, **kwargs)
-        self.headers["authorization"] = f"{result['token_type']} {result['access_token']}"
+        if refresh is None:
+            self.headers["authorization"] = f"{result['token_type']} {result['access_token']}"
+        else:
+            fetch = functools.partial(self.request, method, path, **({"auth": None} | kwargs))
+            self.auth = Token(fetch, result, refresh)
         return result
 
 
@@ -202,25 +1185,52 @@ class Remote(Client):
         self.json = dict(json)
 
     @classmethod
-    def clone(cls, other, path=""):
-        return Client.clone.__func__(cls, other, path, json=other.json)
+    def clone(cls, other, path="", **kwargs):
+        return Client.clone.__func__(cls, other, path, json=dict(other.json), **kwargs)
+
+    def _fresh(self, view) -> bool:
+        return Resource._fresh(self, view) and view.json == self.json
 
     def __call__(self, path: str = "", **json):
         """POST request with json body and [check][clients.base.Remote.check] result."""
         response = self.post(path, json=dict(self.json, **json)).raise_for_status()
-        return self.check(response.json())
+        return self.check(self._loads(response.content))
 
     @staticmethod
     def check(result):
         """Override to return result or raise error, for APIs which don't use status codes."""
         return result
 
+    @contextlib.contextmanager
+    def batch(self, path: str = "") -> Iterator[Batch]:
+        """Context manager which collects calls and POSTs them as a json array on exit.
+
+        Calls return futures of [checked][clients.base.Remote.check] results, matched by `id`,
+        as in JSON-RPC batches.
+        """
+        batch = Batch(self.json)
+        yield batch
+        if batch:
+            response = self.post(path, json=batch).raise_for_status()
+            batch.resolve(self._loads(response.content), self.check)
+
 
 class Graph(Remote):
-    """A `Remote` client which executes GraphQL queries."""
+    """A `Remote` client which executes GraphQL queries.
+
+    Args:
+        url: base url for requests
+        json: default json body for all calls
+        persisted: send query hashes first, i.e., automatic persisted queries
+        **kwargs: same options as `Remote`
+    """
 
     Error = ValueError
 
+    def __init__(self, url: str, json: Mapping = {}, *, persisted: bool = False, **kwargs):
+        super().__init__(url, json, **kwargs)
+        self.persisted = persisted
+
     @classmethod
     def check(cls, result: dict):
         """Return `data` or raise `errors`."""
@@ -228,80 +1238,482 @@ class Graph(Remote):
             raise cls.Error(error)
         return result.get("data")
 
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def digest(query: str) -> str:
+        """Return sha256 hash of query."""
+        return hashlib.sha256(query.encode()).hexdigest()
+
+    @staticmethod
+    def missing(result: dict) -> bool:
+        """Return whether a persisted query was not found."""
+        errors = [error for error in result.get("errors", ()) if isinstance(error, dict)]
+        return any(
+            error.get("message") == "PersistedQueryNotFound"
+            or error.get("extensions", {}).get("code") == "PERSISTED_QUERY_NOT_FOUND"
+            for error in errors
+        )
+
+    def _body(self, query: str, variables: Mapping, full: bool = False) -> dict:
+        body = dict(self.json, variables=variables)
+        if self.persisted:
+            persisted = {"version": 1, "sha256Hash": self.digest(query)}
+            body["extensions"] = dict(body.get("extensions", {}), persistedQuery=persisted)
+        if full or not self.persisted:
+            body["query"] = query
+        return body
+
+    def _post(self, json: dict | list):
+        return self._loads(self.post("", json=json).raise_for_status().content)
+
     def execute(self, query: str, **variables):
-        """Execute query over POST."""
-        return self(query=query, variables=variables)
+        """Execute query over POST, with the hash first if persisted."""
+        result = self._post(self._body(query, variables))
+        if self.missing(result):
+            result = self._post(self._body(query, variables, full=True))
+        return self.check(result)
+
+    def _batch(self, operations: list) -> list:
+        results = self._post([self._body(*operation) for operation in operations])
+        if missing := [index for index, result in enumerate(results) if self.missing(result)]:
+            retried = self._post([self._body(*operations[index], full=True) for index in missing])
+            for index, result in zip(missing, retried):
+                results[index] = result
+        return results
+
+    def execute_many(self, operations: Iterable[tuple[str, Mapping]]) -> list:
+        """Execute queries with variables in a single POST of a json array."""
+        return list(map(self.check, self._batch(list(operations))))
 
 
 class Stats(collections.Counter):
-    """Thread-safe Counter.
+    """Thread-safe Counter with a circuit breaker.
 
     Context manager tracks number of active connections and errors.
+    Errors and failures decay exponentially, with a half-life in seconds.
+
+    Adding errors or failures counts as a failed request, and adding zero failures counts as a
+    successful request. Consecutive failed requests open the circuit; after a cooldown in seconds
+    the circuit is half-open, and a single probe request either closes or reopens it.
+
+    Latency is tracked as a peak EWMA, which decays with a time constant in seconds, and a window
+    of recent samples for quantiles.
     """
 
+    halflife = 60.0
+    threshold = 5
+    cooldown = 10.0
+    tau = 10.0
+    window = 100
+
     def __init__(self):
+        super().__init__(errors=0, failures=0, connections=0)
         self.lock = threading.Lock()
-
-    def add(self, **kwargs):
-        """Atomically add data."""
+        self.updated = self.observed = time.monotonic()
+        self.streak = 0
+        self.opened: float | None = None
+        self.probing = False
+        self.ewma = 0.0
+        self.latencies: collections.deque = collections.deque(maxlen=self.window)
+
+    def factor(self) -> float:
+        """Return decay factor since the last update."""
+        return 0.5 ** ((time.monotonic() - self.updated) / self.halflife)
+
+    def decay(self):
+        if self["errors"] or self["failures"]:
+            factor = self.factor()
+            self["errors"] *= factor
+            self["failures"] *= factor
+        self.updated = time.monotonic()
+
+    def observe(self, latency: float):
+        now = time.monotonic()
+        weight = math.exp((self.observed - now) / self.tau)
+        self.ewma = max(latency, self.ewma * weight + latency * (1 - weight))
+        self.observed = now
+        self.latencies.append(latency)
+
+    def latency(self) -> float:
+        """Return peak EWMA latency, decayed since the last observation."""
+        return self.ewma * math.exp((self.observed - time.monotonic()) / self.tau)
+
+    def record(self, latency: float | None = None, **kwargs):
+        """Decay and add data, observe latency, and update the circuit."""
+        self.decay()
+        for key, value in kwargs.items():
+            self[key] += value
+        if latency is not None:
+            self.observe(latency)
+        if kwargs.get("errors") or kwargs.get("failures"):
+            self.streak += 1
+            if self.probing or self.streak >= self.threshold:
+                self.opened, self.probing = time.monotonic(), False
+                self["errors"] = self["failures"] = 0
+        elif "failures" in kwargs:
+            self.streak, self.opened, self.probing = 0, None, False
+
+    def add(self, latency: float | None = None, **kwargs):
+        """Atomically [record][clients.base.Stats.record] data."""
         with self.lock:
-            self.update(kwargs)
+            self.record(latency, **kwargs)
+
+    def quantile(self, q: float) -> float:
+        """Return quantile of recent latencies."""
+        latencies = sorted(self.latencies)
+        return latencies[min(int(q * len(latencies)), len(latencies) - 1)] if latencies else 0.0
+
+    def state(self) -> str:
+        """Return state of circuit: closed, open, or half-open."""
+        if self.opened is None:
+            return "closed"
+        if self.probing or time.monotonic() < self.opened + self.cooldown:
+            return "open"
+        return "half-open"
 
     def __enter__(self):
         self.add(connections=1)
+        if self.state() == "half-open":
+            self.probing = True
         return self
 
-    def __exit__(self, *args):
-        self.add(connections=-1, errors=int(any(args)))
+    def __exit__(self, exc_type, *args):
+        if exc_type is not None and issubclass(exc_type, asyncio.CancelledError):
+            self.probing = False  # a cancelled probe is not a failure, so allow another
+            self.add(connections=-1)
+        else:
+            self.add(connections=-1, errors=int(exc_type is not None))
+
+
+class Retry:
+    """Retry policy for proxies, with exponential backoff and failover.
+
+    Idempotent requests are retried on transport errors and retryable status codes. Delays are
+    exponential with full jitter. Retries are limited by a deadline per request, and by a budget
+    shared across requests, so that outages are not amplified.
+
+    Args:
+        attempts: maximum number of attempts per request
+        backoff: base delay in seconds, doubled for each retry
+        timeout: deadline in seconds from the start of the request
+        budget: retries earned per request, i.e., the maximum ratio of retries to requests
+        capacity: maximum accumulated retries in the budget
+        methods: idempotent methods which may be retried
+        statuses: status codes which may be retried
+    """
+
+    def __init__(
+        self,
+        attempts: int = 3,
+        backoff: float = 0.1,
+        timeout: float = 10.0,
+        budget: float = 0.2,
+        capacity: float = 10.0,
+        methods: frozenset = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}),
+        statuses: frozenset = frozenset({500, 502, 503, 504}),
+    ):
+        self.attempts, self.backoff, self.timeout = attempts, backoff, timeout
+        self.budget, self.capacity, self.tokens = budget, capacity, capacity
+        self.methods, self.statuses = methods, statuses
+        self.lock = threading.Lock()
+
+    def withdraw(self) -> bool:
+        """Atomically withdraw a retry from the budget."""
+        with self.lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+    def delays(self, method: str) -> Iterator[float]:
+        """Return iterator of delays between attempts, and deposit into the budget.
+
+        Called at the start of a request, which sets the deadline.
+        """
+        with self.lock:
+            self.tokens = min(self.tokens + self.budget, self.capacity)
+        return self._delays(method, time.monotonic() + self.timeout)
+
+    def _delays(self, method: str, deadline: float) -> Iterator[float]:
+        for retry in range(self.attempts - 1) if method in self.methods else ():
+            delay = random.uniform(0, self.backoff * 2**retry)
+            if time.monotonic() + delay > deadline or not self.withdraw():
+                break
+            yield delay
+
+
+class Hedge:
+    """Hedging policy for proxies, which duplicates slow requests to another url.
+
+    Idempotent requests which have not responded within a delay are sent again to the next best
+    url, and the first successful response wins. The delay defaults to a quantile of the url's
+    recent latencies. Hedges are limited by a budget shared across requests, as with retries.
+
+    Args:
+        delay: fixed delay in seconds before hedging, instead of the latency quantile
+        quantile: quantile of recent latencies to wait before hedging
+        budget: hedges earned per request, i.e., the maximum ratio of hedges to requests
+        capacity: maximum accumulated hedges in the budget
+        methods: idempotent methods which may be hedged
+        workers: threads of sync proxies, which should cover the expected concurrency
+    """
+
+    def __init__(
+        self,
+        delay: float | None = None,
+        quantile: float = 0.95,
+        budget: float = 0.1,
+        capacity: float = 10.0,
+        methods: frozenset = frozenset({"GET", "HEAD", "OPTIONS"}),
+        workers: int = 100,
+    ):
+        self.delay, self.quantile = delay, quantile
+        self.budget, self.capacity, self.tokens = budget, capacity, capacity
+        self.methods, self.workers = methods, workers
+        self.lock = threading.Lock()
+
+    def withdraw(self) -> bool:
+        """Atomically withdraw a hedge from the budget."""
+        with self.lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+    def wait(self, method: str, stats: Stats) -> float | None:
+        """Return delay before hedging, or None if not hedged, and deposit into the budget."""
+        with self.lock:
+            self.tokens = min(self.tokens + self.budget, self.capacity)
+        if method not in self.methods or (self.delay is None and not stats.latencies):
+            return None
+        return stats.quantile(self.quantile) if self.delay is None else self.delay
 
 
 class Proxy(Client):
     """An extensible embedded proxy client to multiple hosts.
 
     The default implementation provides load balancing based on active connections.
-    It does not provide error handling or retrying.
+    Error handling and failover are provided by an optional [retry][clients.base.Retry] policy,
+    and tail latency is reduced by an optional [hedge][clients.base.Hedge] policy.
 
     Args:
         *urls: base urls for requests
+        retry: optional retry policy
+        hedge: optional hedging policy
+        strategy: [choice][clients.base.Proxy.choice] strategy
+        weights: optional url weights for rotate and hash strategies
+        balance: load to minimize, either active `connections` or expected `latency`
+        pools: optional connection limits of separate pools by url, which mount default
+            transports, and so may not be combined with a custom `transport`
         **kwargs: same options as `Client`
     """
 
     Stats = Stats
-
-    def __init__(self, *urls: str, **kwargs):
-        super().__init__("https://proxies", **kwargs)
+    Transport = httpx.HTTPTransport
+    replicas = 64  # points per unit weight on the hash ring
+
+    def __init__(
+        self,
+        *urls: str,
+        retry: Retry | None = None,
+        hedge: Hedge | None = None,
+        strategy: str = "priority",
+        weights: Mapping[str, int] = {},
+        balance: str = "connections",
+        pools: Mapping[str, httpx.Limits] = {},
+        **kwargs,
+    ):
+        super().__init__("https://proxies", **self._mount(pools, kwargs))
         self.urls = {(url.rstrip("/") + "/"): self.Stats() for url in urls}
+        self.retry, self.hedge, self.strategy, self.balance = retry, hedge, strategy, balance
+        self._index({url.rstrip("/") + "/": weight for url, weight in weights.items()})
+
+    def _index(self, weights: dict):
+        self.order = list(self.urls)
+        weights = [weights.get(url, 1) for url in self.order]  # type: ignore
+        rotation, current = [], [0] * len(weights)
+        for _ in range(sum(weights)):  # smooth weighted round-robin
+            current = [value + weight for value, weight in zip(current, weights)]
+            index = current.index(max(current))
+            current[index] -= sum(weights)
+            rotation.append(index)
+        self.rotation, self.turns = rotation, itertools.count()
+        ring = sorted(
+            (self.hash(f"{url}#{replica}"), index)
+            for index, url in enumerate(self.order)
+            for replica in range(self.replicas * weights[index])
+        )
+        self.ring = [point for point, _ in ring], [index for _, index in ring]
+
+    @classmethod
+    def _mount(cls, pools: Mapping[str, httpx.Limits], kwargs: dict) -> dict:
+        if pools and "transport" in kwargs:
+            raise ValueError("pools mount their own transports, which would override `transport`")
+        names = "verify", "cert", "trust_env", "http1", "http2"
+        options = {name: kwargs[name] for name in names if name in kwargs}
+        mounts = {}
+        for url, limits in pools.items():
+            url = httpx.URL(url)
+            mounts[f"{url.scheme}://{url.netloc.decode()}"] = cls.Transport(
+                limits=limits, **options
+            )
+        return dict(kwargs, mounts=dict(mounts, **kwargs.get("mounts", {})))
+
+    @staticmethod
+    def hash(key: str) -> int:
+        """Return stable hash of key for consistent hashing."""
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest())
 
     @classmethod
     def clone(cls, other, path=""):
-        urls = (urljoin(url, path) for url in other.urls)
-        return cls(*urls, trailing=other.trailing, **other._attrs)
+        urls = {urljoin(url, path).rstrip("/") + "/": stats for url, stats in other.urls.items()}
+        return Client.clone.__func__(cls, other, urls=urls, order=list(urls))
 
     def priority(self, url: str):
         """Return comparable priority for url.
 
-        Minimizes errors, failures (500s), and active connections.
-        None may be used to eliminate from consideration.
+        Minimizes decayed errors, failures (500s), and load. Load is either active connections,
+        or expected latency: the decayed peak EWMA latency multiplied by pending connections.
+        An idle slow url thereby recovers, so that it is measured again.
+        None may be used to eliminate from consideration, as with an open circuit.
         """
         stats = self.urls[url]
-        return tuple(stats[key] for key in ("errors", "failures", "connections"))
-
-    def choice(self, method: str) -> str:
-        """Return chosen url according to priority.
+        if stats.opened is not None and stats.state() == "open":
+            return None
+        errors, failures, load = stats["errors"], stats["failures"], stats["connections"]
+        if errors or failures:
+            factor = stats.factor()
+            errors, failures = errors * factor, failures * factor
+        if self.balance == "latency":
+            load = stats.latency() * (load + 1)
+        return errors, failures, load
+
+    def choice(self, method: str, key: str = "") -> str:
+        """Return chosen url according to strategy.
+
+        - priority: minimum priority with random ties, O(n)
+        - sample: minimum priority of 2 random choices, O(1)
+        - rotate: weighted round-robin, skipping eliminated urls, O(1)
+        - hash: consistent hashing of key, skipping eliminated urls, O(log n)
+
+        Raises `httpx.ConnectError` if all urls are eliminated, which may be retried.
 
         Args:
             method: placeholder for extensions which distinguish read/write requests
+            key: key for hashing, i.e., the request path
+        """
+        match self.strategy:
+            case "sample" if len(self.order) > 1:
+                pairs = ((self.priority(url), url) for url in random.sample(self.order, 2))
+                eligible = [pair for pair in pairs if pair[0] is not None]
+                if eligible:
+                    return min(eligible, key=lambda pair: pair[0])[1]
+            case "rotate":
+                for turn in itertools.islice(self.turns, len(self.rotation)):
+                    url = self.order[self.rotation[turn % len(self.rotation)]]
+                    if self.priority(url) is not None:
+                        return url
+            case "hash":
+                points, indices = self.ring
+                start = bisect.bisect(points, self.hash(key))
+                for offset in range(len(indices)):
+                    url = self.order[indices[(start + offset) % len(indices)]]
+                    if self.priority(url) is not None:
+                        return url
+        best, urls = None, []
+        for url in self.order:
+            priority = self.priority(url)
+            if priority is None or (best is not None and priority > best):
+                continue
+            if priority == best:
+                urls.append(url)
+            else:
+                best, urls = priority, [url]
+        if not urls:
+            raise httpx.ConnectError("no url is available, as all circuits are open")
+        return random.choice(urls)
+
+    def template(self, path: str) -> Callable[..., str]:
+        """Return function which formats a relative path template with `{name}` fields.
+
+        Values are quoted when formatted, and the path is joined with each chosen url.
         """
-        priorities = collections.defaultdict(list)
-        for url in self.urls:
-            priorities[self.priority(url)].append(url)
-        priorities.pop(None, None)
-        return random.choice(priorities[min(priorities)])
+
+        def format(**fields) -> str:
+            return path.format_map({key: quote(str(fields[key]), safe="") for key in fields})
+
+        return format
+
+    def alternate(self, url: str) -> str | None:
+        """Return next best url other than url for hedging, or None if none are eligible."""
+        pairs = ((self.priority(other), other) for other in self.order if other != url)
+        eligible = [pair for pair in pairs if pair[0] is not None]
+        return min(eligible, key=lambda pair: pair[0])[1] if eligible else None
+
+    @functools.cached_property
+    def _executor(self) -> futures.ThreadPoolExecutor:
+        return futures.ThreadPoolExecutor(self.hedge.workers, thread_name_prefix="hedge")  # type: ignore
+
+    def close(self):
+        """Close transports, and shut down hedging threads unless this is a view."""
+        super().close()
+        if not self._view and "_executor" in self.__dict__:
+            self._executor.shutdown(cancel_futures=True)
+
+    def __exit__(self, *args):
+        super().__exit__(*args)
+        self.close()
+
+    def _attempt(self, url: str, method: str, path: str, kwargs: dict) -> httpx.Response:
+        joined = Joined(urljoin(url, path).rstrip("/") + self.trailing)
+        try:
+            with self.urls[url] as stats:
+                start = time.perf_counter()
+                response = super().request(method, joined, **kwargs)
+            latency = time.perf_counter() - start
+            stats.add(failures=int(response.is_server_error), latency=latency)
+            return response
+        finally:
+            if self.hooks is not None:
+                self.hooks.proxied(url, self.urls[url])
+
+    def _hedged(self, url: str, method: str, path: str, kwargs: dict) -> httpx.Response:
+        if self.hedge is None or (delay := self.hedge.wait(method, self.urls[url])) is None:
+            return self._attempt(url, method, path, kwargs)
+        started = threading.Event()
+
+        def attempt(url: str) -> httpx.Response:
+            started.set()
+            return self._attempt(url, method, path, kwargs)
+
+        attempts = [self._executor.submit(attempt, url)]
+        started.wait()  # the delay excludes time queued for a thread
+        done, _ = futures.wait(attempts, timeout=delay)
+        if not done and (other := self.alternate(url)) is not None and self.hedge.withdraw():
+            attempts.append(self._executor.submit(attempt, other))
+        completed = futures.as_completed(attempts)
+        for future in itertools.islice(completed, len(attempts) - 1):
+            with contextlib.suppress(httpx.TransportError):
+                return future.result()
+        return next(completed).result()
 
     def request(self, method, path, **kwargs):
-        """Send request with relative or absolute path and return response."""
-        url = self.choice(method)
-        with self.urls[url] as stats:
-            response = super().request(method, urljoin(url, path), **kwargs)
-        stats.add(failures=int(response.is_server_error))
-        return response
+        """Send request with relative or absolute path and return response.
+
+        Failed requests are retried on the next chosen url, according to the retry policy.
+        Slow requests are hedged on the next best url, according to the hedge policy; the losing
+        request runs to completion in its thread.
+        """
+        delays = self.retry.delays(method) if self.retry else iter(())
+        while True:
+            url = self.choice(method, path)
+            try:
+                response = self._hedged(url, method, path, kwargs)
+            except httpx.TransportError:
+                if (delay := next(delays, None)) is None:
+                    raise
+            else:
+                retryable = self.retry and response.status_code in self.retry.statuses
+                if not retryable or (delay := next(delays, None)) is None:
+                    return response
+            time.sleep(delay)
@@ -1,7 +1,15 @@
+import json
+import sys
+import threading
+from concurrent import futures
+from http import server
 from importlib import metadata
 
+import httpx2 as httpx
 import pytest
 
+import clients
+
 
 def pytest_report_header(config):
     return "httpx2: " + metadata.version("httpx2")
@@ -10,3 +18,137 @@ def pytest_report_header(config):
 @pytest.fixture
 def url(httpbin):
     return httpbin.url
+
+
+@pytest.fixture
+def contended():
+    def run(func, count=5000, threads=8):
+        def calls(index):
+            return [func(index, num) for num in range(count)]
+
+        with futures.ThreadPoolExecutor(threads) as executor:
+            return list(executor.map(calls, range(threads)))
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # provoke races between threads
+    yield run
+    sys.setswitchinterval(interval)
+
+
+@pytest.fixture
+def keepalive():
+    class Handler(server.BaseHTTPRequestHandler):
+        protocol_version, disable_nagle_algorithm = "HTTP/1.1", True
+
+        def do_GET(self):
+            body = json.dumps({"path": self.path}).encode()
+            self.send_response(200)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def pager():
+    def handler(request):
+        params = request.url.params
+        offset = int(params.get("offset", params.get("cursor", 0)))
+        headers, data = {}, {"items": list(range(10))[offset : offset + 3], "next": None}
+        if offset + 3 < 10:
+            headers["link"] = f'<http://localhost/?offset={offset + 3}>; rel="next"'
+            data["next"] = offset + 3
+        return httpx.Response(200, headers=headers, json=data)
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.fixture
+def graphql():
+    queries = {}
+
+    def execute(body):
+        digest = body.get("extensions", {}).get("persistedQuery", {}).get("sha256Hash")
+        if "query" in body:
+            queries[digest] = body["query"]
+        if digest not in queries:
+            return {"errors": [{"message": "PersistedQueryNotFound"}]}
+        if queries[digest] == "error":
+            return {"errors": ["reason"]}
+        return {"data": {"query": queries[digest], "variables": body["variables"]}}
+
+    def handler(request):
+        body = json.loads(request.content)
+        transport.bodies.append(body)
+        return httpx.Response(
+            200, json=list(map(execute, body)) if isinstance(body, list) else execute(body)
+        )
+
+    transport = httpx.MockTransport(handler)
+    transport.bodies = []
+    return transport
+
+
+@pytest.fixture
+def jsonrpc():
+    def result(body):
+        if body["method"] == "fail":
+            return {"jsonrpc": "2.0", "id": body["id"], "error": {"message": "fail"}}
+        return {"jsonrpc": "2.0", "id": body["id"], "result": body["params"]}
+
+    def handler(request):
+        if request.url.path == "/invalid":
+            error = {"code": -32600, "message": "Invalid Request"}
+            return httpx.Response(200, json={"jsonrpc": "2.0", "id": None, "error": error})
+        return httpx.Response(
+            200, json=[result(body) for body in reversed(json.loads(request.content))]
+        )
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.fixture
+def oauth():
+    def handler(request):
+        if request.url.path == "/token":
+            token = str(len(transport.tokens))
+            transport.tokens.append(f"Bearer {token}")
+            data = {"access_token": token, "token_type": "Bearer", "expires_in": 3600}
+            return httpx.Response(200, json=data)
+        authorization = request.headers.get("authorization")
+        status = 200 if authorization == transport.tokens[-1] else 401
+        return httpx.Response(status, json={"authorization": authorization})
+
+    transport = httpx.MockTransport(handler)
+    transport.tokens = []
+    return transport
+
+
+@pytest.fixture
+def hooks():
+    class Hooks(clients.Hooks):
+        def __init__(self):
+            self.requests, self.timings, self.proxies = [], [], []
+
+        def before(self, request):
+            self.requests.append(request)
+
+        def after(self, request, response, timings):
+            self.timings.append(timings)
+
+        def decoded(self, response, seconds):
+            self.timings[-1]["decode"] = seconds
+
+        def proxied(self, url, stats):
+            self.proxies.append(url)
+
+    return Hooks()
@@ -1,6 +1,8 @@
 import asyncio
+import io
 import json
 import operator
+import time
 
 import httpx2 as httpx
 import pytest
@@ -40,6 +42,80 @@ async def test_resource(url):
             assert data["etag"] == "W/0"
 
 
+async def test_cache(url):
+    resource = clients.AsyncResource(url)
+    resource.cache = clients.Cache()
+    data = await resource.get("cache")
+    assert await resource.get("cache") is data
+    assert await resource.get("cache", headers={"if-none-match": "*"}) is data
+    data = await resource.get("cache/60")
+    assert await resource.get("cache/60") is data
+
+
+async def test_flights():
+    urls = []
+
+    async def handler(request):
+        urls.append(request.url)
+        await asyncio.sleep(0.1)
+        return httpx.Response(200 if request.url.path == "/ok" else 500, json={})
+
+    resource = clients.AsyncResource("http://localhost/", transport=httpx.MockTransport(handler))
+    resource.flights = clients.SingleFlight()
+    assert await asyncio.gather(*(resource.get("ok") for _ in range(4))) == [{}] * 4
+    assert len(urls) == 1
+    results = await asyncio.gather(*(resource["error"] for _ in range(2)), return_exceptions=True)
+    assert all(isinstance(result, httpx.HTTPStatusError) for result in results)
+    assert len(urls) == 2 and not resource.flights.flights
+
+
+async def test_limiter():
+    counts = {"active": 0, "peak": 0}
+
+    async def handler(request):
+        if request.url.path == "/error":
+            raise httpx.ConnectError("refused")
+        counts["active"] += 1
+        counts["peak"] = max(counts["peak"], counts["active"])
+        await asyncio.sleep(0.01)
+        counts["active"] -= 1
+        headers = {"x-ratelimit-remaining": "0", "x-ratelimit-reset": "0.05"}
+        return httpx.Response(200, headers=headers)
+
+    client = clients.AsyncClient("http://localhost/", transport=httpx.MockTransport(handler))
+    client.limiter = limiter = clients.Limiter(concurrency=2)
+    await asyncio.gather(*(client.get("ok") for _ in range(6)))
+    assert counts["peak"] == 2 and limiter.active == 0
+    assert limiter.resumes > time.monotonic()
+    with pytest.raises(httpx.ConnectError):
+        await client.get("error")
+    assert limiter.active == 0
+
+
+async def test_stream(url):
+    resource = clients.AsyncResource(url)
+    assert [line["id"] async for line in resource / "stream/3"] == [0, 1, 2]
+    lines = [line async for line in resource / "html"]
+    assert lines[0] == "<!DOCTYPE html>"
+    chunks = [chunk async for chunk in resource.stream(path="stream-bytes/256")]
+    assert sum(map(len, chunks)) == 256
+    slides = resource.stream(path="json", items=["slideshow", "slides"])
+    assert [slide async for slide in slides] == (await resource.get("json"))["slideshow"]["slides"]
+
+    async def content():
+        yield b'[{"key":'
+        yield b" 0}]"
+
+    headers = {"content-type": "application/json"}
+    transport = httpx.MockTransport(
+        lambda request: httpx.Response(200, headers=headers, content=content())
+    )
+    items = clients.AsyncResource(url, transport=transport).stream(items=())
+    assert [item async for item in items] == [{"key": 0}]
+    file = await resource.download(io.BytesIO(), "stream-bytes/256", chunk_size=100)
+    assert file.tell() == 256
+
+
 async def test_content(url):
     resource = clients.AsyncResource(url)
     resource.content_type = lambda response: "json"
@@ -47,6 +123,48 @@ async def test_content(url):
     assert not hasattr(coro, "__aenter__")
     with pytest.raises(ValueError):
         await coro
+    resource = type("", (clients.AsyncResource,), {"content_type": staticmethod(str)})(url)
+    assert resource.content_type is str
+
+
+async def test_gather(url):
+    resource = clients.AsyncResource(url)
+    items = ["get", {"q": "0"}, "status/404"]
+    results = [result async for result in resource.gather(items, return_exceptions=True)]
+    assert results[0]["url"] == url + "/get" and isinstance(results[2], httpx.HTTPError)
+    resource = resource.anything
+    pairs = {key: value async for key, value in resource.gather("abc", ordered=False)}
+    assert {key: value["url"] for key, value in pairs.items()} == {
+        key: f"{url}/anything/{key}" for key in "abc"
+    }
+    with pytest.raises(httpx.HTTPError):
+        [result async for result in clients.AsyncResource(url).gather(["status/404"])]
+
+
+def test_run(url):
+    client = clients.AsyncClient(url)
+    assert client.run("get", "get").status_code == 200
+    loop = client._runner.get_loop()
+    assert (client / "ip").run("get").status_code == 200
+    assert client._runner.get_loop() is loop
+    view = client / "ip"
+    view.close()
+    assert view.is_closed and not client.is_closed and not loop.is_closed()
+    responses = client.run_many([client.get("get"), client.get("status/404")])
+    assert [response.status_code for response in responses] == [200, 404]
+    client.close()
+    assert client.is_closed and loop.is_closed()
+
+
+async def test_paginate(pager):
+    resource = clients.AsyncResource("http://localhost/", transport=pager)
+    items = resource.paginate(pages=clients.Pages("items"), prefetch=True)
+    assert [item async for item in items] == list(range(10))
+    items = resource.paginate(pages=clients.OffsetPages(limit=3, items="items"))
+    assert [item async for item in items] == list(range(10))
+    items = resource.paginate(pages=clients.CursorPages("next", items="items"), prefetch=True)
+    assert await anext(items) == 0
+    await items.aclose()
 
 
 def test_authorize(url, monkeypatch):
@@ -59,6 +177,30 @@ def test_authorize(url, monkeypatch):
         assert resource.headers["authorization"] == "Bearer abc123"
 
 
+async def test_token(oauth):
+    resource = clients.AsyncResource("http://localhost/", transport=oauth)
+    assert (await resource.authorize("token", refresh=10, json={}))["access_token"] == "0"
+    token = resource.auth
+    oauth.tokens.append("revoked")
+    assert await (resource / "data").get() == {"authorization": "Bearer 2"}
+    token.expires = time.time() + 5
+    async with token.alock:
+        assert await resource.get("data") == {"authorization": "Bearer 2"}
+    assert await resource.get("data") == {"authorization": "Bearer 3"}
+    token.expires = time.time()
+    async with token.alock:
+        task = asyncio.ensure_future(resource.get("data"))
+        await asyncio.sleep(0.01)
+        oauth.tokens.append("Bearer other")
+        token.update({"access_token": "other", "token_type": "Bearer"})
+    assert await task == {"authorization": "Bearer other"}
+    assert len(oauth.tokens) == 5
+    resource.limiter, token.expires = clients.Limiter(concurrency=1), time.time()
+    assert await resource.get("data") == {"authorization": "Bearer 5"}
+    oauth.tokens.append("revoked")
+    assert await resource.get("data") == {"authorization": "Bearer 7"}
+
+
 async def test_remote(url):
     remote = clients.AsyncRemote(url, json={"key": "value"})
     assert (await remote("post"))["json"] == {"key": "value"}
@@ -66,18 +208,118 @@ async def test_remote(url):
     assert await (remote / "post")(name="value") == {"key": "value", "name": "value"}
 
 
+async def test_batch(jsonrpc):
+    remote = clients.AsyncRemote("http://localhost/", json={"jsonrpc": "2.0"}, transport=jsonrpc)
+    remote.check = operator.itemgetter("result")
+    async with remote.batch("rpc") as batch:
+        futures = [batch(method="echo", params=[index]) for index in range(3)]
+        assert batch[-1] == {"jsonrpc": "2.0", "method": "echo", "params": [2], "id": 2}
+    assert [await future for future in futures] == [[0], [1], [2]]
+    async with remote.batch() as batch:
+        pass
+    async with remote.batch("invalid") as batch:
+        future = batch(method="echo", params=[0])
+    with pytest.raises(KeyError):
+        await future
+
+
 async def test_graph(url):
     graph = clients.AsyncGraph(url).anything
     data = await graph.execute("{ viewer { login }}")
     assert json.loads(data) == {"query": "{ viewer { login }}", "variables": {}}
     with pytest.raises(httpx.HTTPError, match="reason"):
         clients.AsyncGraph.check({"errors": ["reason"]})
+    graph = clients.AsyncGraph(url, {"operationName": "name"})
+    assert graph.json == {"operationName": "name"} and not graph.persisted
+
+
+async def test_persisted(graphql):
+    graph = clients.AsyncGraph("http://localhost/", persisted=True, transport=graphql)
+    assert (await graph.execute("{ a }"))["query"] == "{ a }"
+    assert [len(body) for body in graphql.bodies] == [2, 3]
+    results = await graph.execute_many([("{ a }", {}), ("{ b }", {})])
+    assert [result["query"] for result in results] == ["{ a }", "{ b }"]
+    assert [len(body) for body in graphql.bodies[-2:]] == [2, 1]
+    graph = clients.AsyncGraph("http://localhost/", persisted=True, window=0.01, transport=graphql)
+    graph /= "graphql"
+    results = await asyncio.gather(*(graph.execute("{ a }", x=x) for x in range(3)))
+    assert [result["variables"] for result in results] == [{"x": 0}, {"x": 1}, {"x": 2}]
+    assert len(graphql.bodies[-1]) == 3
+    with pytest.raises(httpx.HTTPError, match="reason"):
+        await asyncio.gather(graph.execute("error"), graph.execute("{ a }"))
 
 
 async def test_proxy(httpbin):
     proxy = clients.AsyncProxy(httpbin.url, f"http://localhost:{httpbin.port}")
     urls = {(await proxy.get("status/500")).url for _ in proxy.urls}
     assert len(urls) == len(proxy.urls)
+    stats = proxy.urls[httpbin.url + "/"]
+    assert isinstance(stats, clients.aio.AsyncStats) and stats["failures"] > 0.9
+    await asyncio.gather(*(proxy.get("get") for _ in range(10)))
+    assert stats["connections"] == 0
+    assert sum(len(stats.latencies) for stats in proxy.urls.values()) == 12
+    response = await proxy.get(proxy.template("anything/{name}")(name="a/b"))
+    assert response.request.url.raw_path == b"/anything/a%2Fb"
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json={}))
+    proxy = clients.AsyncProxy("http://localhost", transport=transport)
+    assert (await proxy.get("path")).json() == {} and proxy.urls["http://localhost/"].latencies
+
+
+async def test_hooks(httpbin, hooks):
+    proxy = clients.AsyncProxy(httpbin.url)
+    proxy.hooks, proxy.limiter = hooks, clients.Limiter()
+    assert (await proxy.get("get")).status_code == 200
+    assert {"send", "wait", "receive_response_headers"} <= set(hooks.timings[0])
+    assert hooks.proxies == [httpbin.url + "/"]
+
+
+async def test_pools(httpbin):
+    proxy = clients.AsyncProxy(httpbin.url, pools={httpbin.url: httpx.Limits(max_connections=2)})
+    await asyncio.gather(*(proxy.get("delay/0.1") for _ in range(4)))
+    assert list(proxy.pools()) == [httpbin.url, "all://"]
+
+
+async def test_retry(httpbin):
+    proxy = clients.AsyncProxy(httpbin.url, "http://localhost:1", retry=clients.Retry(backoff=0))
+    proxy.urls[httpbin.url + "/"]["errors"] = 1
+    assert (await proxy.get("get")).status_code == 200
+    proxy = clients.AsyncProxy(httpbin.url, retry=clients.Retry(backoff=0))
+    assert (await proxy.get("status/500")).status_code == 500
+    assert round(proxy.urls[httpbin.url + "/"]["failures"]) == 3
+    proxy = clients.AsyncProxy("http://localhost:1", retry=clients.Retry(attempts=1))
+    with pytest.raises(httpx.ConnectError):
+        await proxy.get()
+
+
+async def test_hedge():
+    async def handler(request):
+        if request.url.host == "slow":
+            await asyncio.sleep(0.2)
+        elif request.url.host == "error":
+            raise httpx.ConnectError("refused")
+        return httpx.Response(200, json=request.url.host)
+
+    transport, hedge = httpx.MockTransport(handler), clients.Hedge(delay=0.05)
+    proxy = clients.AsyncProxy("http://slow", "http://fast", hedge=hedge, transport=transport)
+    proxy.strategy = "rotate"
+    assert (await proxy.get("path")).json() == "fast"
+    await asyncio.sleep(0)
+    assert proxy.urls["http://slow/"]["connections"] == proxy.urls["http://slow/"]["errors"] == 0
+    assert (await proxy.get("path")).json() == "fast"
+    assert hedge.tokens == 9.1
+    proxy.hedge = clients.Hedge(delay=0.05, capacity=0)
+    assert (await proxy.get("path")).json() == "slow"
+    proxy = clients.AsyncProxy("http://slow", "http://error", hedge=hedge, transport=transport)
+    proxy.strategy = "rotate"
+    assert (await proxy.get("path")).json() == "slow"
+    proxy = clients.AsyncProxy("http://slow", hedge=hedge, transport=transport)
+    assert (await proxy.get("path")).json() == "slow"
+    proxy = clients.AsyncProxy("http://slow", "http://fast", hedge=hedge, transport=transport)
+    stats = proxy.urls["http://slow/"]
+    stats.opened, proxy.strategy = time.monotonic() - stats.cooldown, "rotate"
+    assert (await proxy.get("path")).json() == "fast"
+    await asyncio.sleep(0)
+    assert not stats.probing and stats.state() == "half-open"
 
 
 def test_clones():
@@ -88,6 +330,7 @@ def test_clones():
     resource = clients.AsyncResource("http://localhost/").path
     assert str(resource) == "AsyncResource(http://localhost/path/... )"
     assert type(resource.client) is clients.AsyncClient
+    assert resource._transport is resource.client._transport
 
     remote = clients.AsyncRemote("http://localhost/").path
     assert str(remote) == "AsyncRemote(http://localhost/path/... )"
@@ -95,3 +338,19 @@ def test_clones():
 
     proxy = clients.AsyncProxy("http://localhost/", "http://127.0.0.1") / "path"
     assert str(proxy) == "AsyncProxy(https://proxies/... )"
+
+
+async def test_views():
+    transport, closed = httpx.MockTransport(lambda request: httpx.Response(200)), []
+
+    async def aclose():
+        closed.append(True)
+
+    transport.aclose = aclose
+    client = clients.AsyncClient("http://localhost/", transport=transport)
+    async with client:
+        view = client / "path"
+        async with view:
+            assert (await view.get()).is_success
+        assert view.is_closed and not closed and (await client.get()).is_success
+    assert client.is_closed and closed == [True]
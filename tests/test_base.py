@@ -1,6 +1,11 @@
+import functools
 import io
 import json
 import operator
+import threading
+import time
+import types
+from concurrent import futures
 
 import httpx2 as httpx
 import pytest
@@ -38,6 +43,187 @@ def test_path(url):
 
     assert str(cookies.get("/").url) == url
     assert str(cookies.get(url).url) == url
+    client.max_urls = 1
+    assert client._url("get") is client._url("get") and client._url("ip")
+    assert list(client._urls[2]) == ["ip"]
+    client.trailing = "/"
+    assert client._url("get").endswith("get/")
+    repos = clients.Resource(url).template("anything/{name}/repos/{id}")
+    assert repos(name="a b", id=1) == url + "/anything/a%20b/repos/1"
+    response = clients.Client(url).get(repos(name="a/b", id=1))
+    assert response.request.url.raw_path == b"/anything/a%2Fb/repos/1"
+    proxy = clients.Proxy(url)
+    response = proxy.get(proxy.template("anything/{name}")(name="a/b"))
+    assert response.request.url.raw_path == b"/anything/a%2Fb"
+
+
+def test_evict(contended):
+    client = clients.Client("http://localhost/")
+    client.max_urls = 1
+    contended(lambda index, num: client._url(f"{index}/{num}"))
+    assert len(client._urls[2]) == 1
+    resource = clients.Resource("http://localhost/")
+    resource.max_views = 1
+    contended(lambda index, num: getattr(resource, f"path{num % 2}"), count=1000)
+    assert len(resource._views) == 1
+    content_type = clients.ContentTypes(maxsize=1, text="text/")
+
+    def decode(index, num):
+        return content_type(types.SimpleNamespace(headers={"content-type": f"text/{index}.{num}"}))
+
+    contended(decode)
+    assert len(content_type.memo) == 1
+
+
+def test_pool(url):
+    resource = clients.Resource(url)
+    assert resource.anything.path()["url"] == url + "/anything/path"
+    view = resource.anything.path
+    assert view._transport is resource.client._transport is resource._transport
+    assert view.headers is resource.headers and view.cookies is resource.cookies
+
+
+def test_handshakes(keepalive, hooks):
+    resource = clients.Resource(keepalive)
+    resource.hooks = hooks
+    for index in range(1000):
+        assert resource.anything.path(index=index)["path"] == f"/anything/path?index={index}"
+    assert len(hooks.timings) == 1000
+    assert sum("connect_tcp" in timings for timings in hooks.timings) == 1
+
+
+def test_cache(url, tmp_path):
+    resource = clients.Resource(url)
+    resource.cache = clients.Cache()
+    data = resource.get("cache/60")
+    assert resource.get("cache/60") is data and resource.cache.size
+    assert resource.get("cache/60", params={"q": 0}) is not data
+    data = resource.get("etag/abc")
+    assert resource.cache.get(url + "/etag/abc").validators == {"if-none-match": "abc"}
+    assert resource.get("etag/abc") is data
+    data = resource("response-headers", **{"cache-control": "no-store", "etag": "abc"})
+    assert resource("response-headers", **{"cache-control": "no-store", "etag": "abc"}) == data
+    assert resource.cache.get(url + "/response-headers?cache-control=no-store&etag=abc") is None
+    params = {"cache-control": "max-age=60", "vary": "x-test"}
+    data = resource("response-headers", **params)
+    assert resource("response-headers", **params) is data
+    assert resource.get("response-headers", params=params, headers={"x-test": ""}) is not data
+    resource.cache.maxsize = 0
+    resource.get("etag/abc")
+    assert not resource.cache.entries and not resource.cache.size
+
+    resource.cache = clients.DiskCache(tmp_path)
+    data = resource.get("cache/60")
+    assert resource.get("cache/60") == data and resource.cache.size
+    assert clients.DiskCache(tmp_path).size == resource.cache.size
+    resource.cache.maxsize = resource.cache.size
+    resource.get("cache/60")
+    resource.get("cache/30")
+    assert len(list(tmp_path.iterdir())) == 1
+    assert resource.cache.get(url + "/cache/60") is None
+    resource.cache.maxsize = 0
+    resource.get("cache/60")
+    assert not list(tmp_path.iterdir()) and not resource.cache.size
+    resource.cache.maxsize, resource.headers["authorization"] = 2**20, "token"
+    resource("response-headers", **{"cache-control": "max-age=60"})
+    assert not list(tmp_path.iterdir())
+    resource.get("cache/60")
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_freshness():
+    def freshness(**headers):
+        return clients.base.freshness(httpx.Response(200, headers=headers))
+
+    assert freshness() == 0.0
+    assert freshness(**{"cache-control": "private, max-age=60", "age": "10"}) == 50.0
+    assert freshness(**{"cache-control": "no-cache, max-age=60"}) == 0.0
+    assert freshness(**{"cache-control": "no-store"}) is freshness(vary="*") is None
+    date, expires = "Sun, 18 Oct 2026 00:00:00 GMT", "Sun, 18 Oct 2026 00:01:00 GMT"
+    assert freshness(date=date, expires=expires) == 60.0
+    assert freshness(expires="0") == 0.0
+    request = httpx.Request("GET", "http://localhost/", headers={"authorization": "token"})
+    response = httpx.Response(200, headers={"cache-control": "max-age=60"}, request=request)
+    assert clients.base.freshness(response) == 60.0
+    assert clients.base.freshness(response, shared=True) is None
+    response.headers["cache-control"] = "public, max-age=60, s-maxage=30"
+    assert clients.base.freshness(response, shared=True) == 30.0
+    response.headers["cache-control"] = "private, max-age=60"
+    del response.request.headers["authorization"]
+    assert clients.base.freshness(response, shared=True) is None
+
+
+def test_flights():
+    urls = []
+
+    def handler(request):
+        urls.append(request.url)
+        time.sleep(0.2)
+        return httpx.Response(200 if request.url.path == "/ok" else 500, json={})
+
+    resource = clients.Resource("http://localhost/", transport=httpx.MockTransport(handler))
+    resource.flights = clients.SingleFlight(["authorization"])
+    assert list(resource.map(["ok"] * 4)) == [{}] * 4
+    assert len(urls) == 1
+    results = resource.map(["error"] * 2, return_exceptions=True)
+    assert all(isinstance(result, httpx.HTTPStatusError) for result in results)
+    assert len(urls) == 2 and not resource.flights.flights
+    assert resource.get("ok", headers={"authorization": "token"}) == {}
+    assert len(urls) == 3
+
+
+def test_limiter():
+    lock, counts = threading.Lock(), {"active": 0, "peak": 0}
+
+    def handler(request):
+        if request.url.path == "/error":
+            raise httpx.ConnectError("refused")
+        with lock:
+            counts["active"] += 1
+            counts["peak"] = max(counts["peak"], counts["active"])
+        time.sleep(0.02)
+        with lock:
+            counts["active"] -= 1
+        if request.url.path == "/throttle":
+            return httpx.Response(429, headers={"retry-after": "0"})
+        return httpx.Response(200)
+
+    client = clients.Client("http://localhost/", transport=httpx.MockTransport(handler))
+    client.limiter = clients.Limiter(concurrency=2)
+    assert all(response.is_success for response in client.map(["ok"] * 6))
+    assert counts["peak"] == 2 and (client / "path").limiter is client.limiter
+    client.limiter = limiter = clients.Limiter(rate=20, concurrency=4, adaptive=True)
+    start = time.monotonic()
+    assert client.get("throttle").status_code == 429 and limiter.limit == 2
+    for _ in range(4):
+        client.get("ok")
+    assert time.monotonic() - start > 0.19 and 2 < limiter.limit < 4
+    with pytest.raises(httpx.ConnectError):
+        client.get("error")
+    assert limiter.active == 0
+    with pytest.raises(ValueError, match="finite"):
+        clients.Limiter(adaptive=True)
+
+
+def test_throttling():
+    response = httpx.Response(503, headers={"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})
+    assert clients.base.throttling(response) < 0
+    response = httpx.Response(429, headers={"retry-after": "soon"})
+    assert clients.base.throttling(response) is None
+    headers = {"x-ratelimit-remaining": "0", "x-ratelimit-reset": str(time.time() + 10)}
+    assert 9 < clients.base.throttling(httpx.Response(200, headers=headers)) <= 10
+    headers = {"x-ratelimit-remaining": "0", "x-ratelimit-reset": "10"}
+    assert clients.base.throttling(httpx.Response(200, headers=headers)) == 10
+    assert clients.base.throttling(httpx.Response(200)) is None
+
+
+def test_codec(url):
+    resource = clients.Resource(url)
+    loads = functools.partial(json.loads, object_hook=lambda data: types.SimpleNamespace(**data))
+    resource.codec = clients.Codec(lambda data: json.dumps(data).encode(), loads)
+    result = resource.post("post", {"key": "value"})
+    assert result.json.key == "value" and vars(result.headers)["Content-Type"] == "application/json"
+    assert (resource / "anything").codec is resource.codec
 
 
 def test_trailing(url):
@@ -67,6 +253,132 @@ def test_methods(url):
     assert file.tell()
 
 
+def test_map(url, httpbin):
+    resource = clients.Resource(url)
+    results = list(resource.map(["get", {"q": "0"}, "status/404"], return_exceptions=True))
+    assert results[0]["url"] == url + "/get" and isinstance(results[2], httpx.HTTPError)
+    assert isinstance(results[1], str)
+    resource = resource.anything
+    pairs = dict(resource.map(map(str, range(5)), limit=2, ordered=False))
+    assert {key: value["url"] for key, value in pairs.items()} == {
+        key: f"{url}/anything/{key}" for key in map(str, range(5))
+    }
+    with pytest.raises(httpx.HTTPError):
+        list(clients.Resource(url).map(["status/404"]))
+    proxy = clients.Proxy(httpbin.url, f"http://localhost:{httpbin.port}")
+    assert [response.status_code for response in proxy.map(["get"] * 4)] == [200] * 4
+
+
+def test_items(url):
+    resource = clients.Resource(url)
+    slides = resource.stream(path="json", items=["slideshow", "slides"])
+    assert list(slides) == resource.get("json")["slideshow"]["slides"]
+    assert list(resource.stream("POST", "anything", items=["json"], json=[0, 1])) == [0, 1]
+    data = [1, -1.5e3, "a,]b", {"key": [1, {"}": "]"}]}, [], True, None, "\u00e9"]
+    text = json.dumps({"skip": {"data": [0]}, "data": data, "rest": 0})
+    for size in (1, 3, 10):
+        parser = clients.base.ItemParser(["data"])
+        items = [
+            item for i in range(0, len(text), size) for item in parser.feed(text[i : i + size])
+        ]
+        assert items + parser.feed("", final=True) == data
+    assert clients.base.ItemParser(["data"]).feed('{"key": 0}', final=True) == []
+    with pytest.raises(json.JSONDecodeError, match="Unexpected value"):
+        clients.base.ItemParser().feed("{}")
+    for text in ("[0", "[0 x]", '{"data" 0}', "{"):
+        with pytest.raises(json.JSONDecodeError):
+            clients.base.ItemParser(["data"] if text.startswith("{") else []).feed(text, True)
+
+
+def test_download(url, tmp_path):
+    resource = clients.Resource(url)
+    content = resource.get("range/1000")
+    with open(tmp_path / "file", "w+b") as file:
+        assert resource.download(file, "range/1000", parts=4).tell() == 1000
+        file.seek(0)
+        assert file.read() == content
+        file.truncate(300)
+        assert resource.download(file, "range/1000", parts=3).tell() == 1000
+        file.seek(0)
+        assert file.read() == content
+        assert resource.download(file, "range/1000", parts=3).tell() == 1000
+    with open(tmp_path / "file", "w+b") as file:
+        assert resource.download(file, "bytes/10", parts=2).tell() == 10
+        file.truncate(0)
+        with pytest.raises(httpx.RemoteProtocolError, match="ignored"):
+            resource.download(file, "response-headers", parts=2, params={"accept-ranges": "bytes"})
+        assert file.seek(0, 2) == 0
+
+    def handler(request):
+        headers = {"accept-ranges": "bytes", "content-length": "10"}
+        content = b"01234" if request.headers.get("range") == "bytes=0-4" else b"5"
+        status = 206 if "range" in request.headers else 200
+        return httpx.Response(status, headers=headers, content=content)
+
+    resource = clients.Resource(url, transport=httpx.MockTransport(handler))
+    with open(tmp_path / "file", "w+b") as file:
+        with pytest.raises(httpx.RemoteProtocolError, match="Incomplete"):
+            resource.download(file, parts=2)
+        assert file.seek(0, 2) == 6
+
+    def handler(request):
+        headers = {"accept-ranges": "bytes", "etag": 'W/"1"', "last-modified": "then"}
+        if request.method == "HEAD":
+            return httpx.Response(200, headers=headers | lengths.pop())
+        requests.append(request)
+        return httpx.Response(200, headers=headers, content=b"0123456789")  # modified since HEAD
+
+    resource = clients.Resource(url, transport=httpx.MockTransport(handler))
+    requests, lengths = [], [{"content-length": "10"}, {}]
+    with open(tmp_path / "file", "w+b") as file:
+        assert resource.download(file, parts=2).tell() == 10
+        file.truncate(0)
+        with pytest.raises(httpx.RemoteProtocolError, match="changed"):
+            resource.download(file, parts=2)
+    assert requests[-1].headers["if-range"] == "then"
+
+    def handler(request):
+        headers = {"accept-ranges": "bytes", "etag": f'"{version[0]}"'}
+        content = version.encode() * 100
+        if request.method == "HEAD":
+            return httpx.Response(200, headers=headers | {"content-length": "100"})
+        ranges.append(request.headers["range"])
+        if request.headers["if-range"] != headers["etag"]:
+            return httpx.Response(200, headers=headers, content=content)
+        begin, end = map(int, request.headers["range"].split("=")[1].split("-"))
+        return httpx.Response(206, headers=headers, content=content[begin : end + 1])
+
+    resource = clients.Resource(url, transport=httpx.MockTransport(handler))
+    version, ranges = "A", []
+    with open(tmp_path / "file", "w+b") as file:
+        assert resource.download(file, parts=2).tell() == 100
+        file.truncate(40)
+        version = "B"
+        assert resource.download(file, parts=2, validator='"A"').tell() == 100
+        file.seek(0)
+        assert file.read() == b"B" * 100 and ranges[-2:] == ["bytes=0-49", "bytes=50-99"]
+        file.truncate(40)
+        assert resource.download(file, parts=2, validator='"B"').tell() == 100
+        file.seek(0)
+        assert file.read() == b"B" * 100 and ranges[-2:] == ["bytes=40-69", "bytes=70-99"]
+        assert resource.download(file, parts=2, validator='"B"').tell() == 100
+        file.write(b"extra")
+        assert resource.download(file, parts=2, validator='"B"').tell() == 100
+        assert file.seek(0, 2) == 100 and ranges[-1] == "bytes=50-99"
+
+
+def test_paginate(pager):
+    resource = clients.Resource("http://localhost/", transport=pager)
+    assert list(resource.paginate(pages=clients.Pages("items"))) == list(range(10))
+    pages = clients.CursorPages("next", items="items")
+    assert list(resource.paginate(pages=pages, prefetch=True)) == list(range(10))
+    pages = clients.OffsetPages(limit=3, items="items")
+    assert list(resource.paginate(pages=pages, params={"offset": 6})) == [6, 7, 8, 9]
+    assert list(resource.paginate(pages=clients.OffsetPages(items="items"))) == list(range(10))
+    items = resource.paginate(pages=clients.CursorPages("data.next", items="items"))
+    assert list(items) == [0, 1, 2]
+
+
 def test_authorize(url, monkeypatch):
     resource = clients.Resource(url)
     result = {"access_token": "abc123", "token_type": "Bearer", "expires_in": 0}
@@ -76,6 +388,31 @@ def test_authorize(url, monkeypatch):
         assert resource.headers["authorization"] == "Bearer abc123"
 
 
+def test_token(oauth):
+    resource = clients.Resource("http://localhost/", transport=oauth)
+    assert resource.authorize("token", refresh=10, json={})["access_token"] == "0"
+    token = resource.auth
+    oauth.tokens.append("revoked")
+    assert (resource / "data").get() == {"authorization": "Bearer 2"}
+    token.expires = time.time() + 5
+    with token.lock:
+        assert resource.get("data") == {"authorization": "Bearer 2"}
+    assert resource.get("data") == {"authorization": "Bearer 3"}
+    token.expires = time.time()
+    with token.lock:
+        thread = threading.Thread(target=resource.get, args=("data",))
+        thread.start()
+        time.sleep(0.1)
+        oauth.tokens.append("Bearer other")
+        token.update({"access_token": "other", "token_type": "Bearer"})
+    thread.join()
+    assert len(oauth.tokens) == 5 and token.expires == float("inf")
+    resource.limiter, token.expires = clients.Limiter(concurrency=1), time.time()
+    assert resource.get("data") == {"authorization": "Bearer 5"}
+    oauth.tokens.append("revoked")
+    assert resource.get("data") == {"authorization": "Bearer 7"}
+
+
 def test_callback(url):
     resource = clients.Resource(url, params={"etag": "W/0", "last-modified": "now"})
     with pytest.raises(httpx.HTTPError, match="405") as exc:
@@ -98,6 +435,26 @@ def test_meta(url):
     assert clients.Resource.content_type(response) == ""
 
 
+def test_content_types(url):
+    resource = clients.Resource(url)
+    resource.content_type = clients.ContentTypes(maxsize=1, json="application/json")
+    resource.content_type.register("xml", "application/xml", lambda content: content.decode())
+    assert resource.get("xml").startswith("<?xml")
+    assert resource.get("json")["slideshow"] and list(resource.content_type.memo) == [
+        "application/json"
+    ]
+    assert isinstance(resource.get("html"), bytes)
+    assert resource.content_type is resource.anything.content_type
+    resource = clients.Resource(url)
+    resource.content_type.register("html", "text/html")
+    assert resource.content_type is not clients.Resource.content_type
+    assert "html" not in clients.Resource("http://localhost/").content_type.patterns
+    response = httpx.Response(200, headers={"content-type": "text/html"})
+    assert clients.base.content_type(response, html="text/html", text="text/") == "html"
+    resource = type("", (clients.Resource,), {"content_type": staticmethod(str)})(url)
+    assert resource.content_type is str
+
+
 def test_remote(url):
     remote = clients.Remote(url, json={"key": "value"})
     assert remote("post")["json"] == {"key": "value"}
@@ -105,18 +462,239 @@ def test_remote(url):
     assert (remote / "post")(name="value") == {"key": "value", "name": "value"}
 
 
+def test_batch(jsonrpc):
+    remote = clients.Remote("http://localhost/", json={"jsonrpc": "2.0"}, transport=jsonrpc)
+    remote.check = lambda result: result["result"]
+    with remote.batch() as batch:
+        first, second = batch(method="echo", params=[1]), batch(method="echo", params=[2])
+        failure = batch(method="fail", params=[])
+        assert not first.done()
+    assert (first.result(), second.result()) == ([1], [2])
+    assert isinstance(failure.exception(), KeyError)
+    with remote.batch() as batch:
+        pass
+    assert batch == []
+    remote.json["id"] = 1
+    with remote.batch() as batch:
+        first, second = batch(method="echo", params=[1]), batch(method="echo", params=[2])
+        with pytest.raises(ValueError, match="duplicate"):
+            batch(method="echo", params=[], id=1)
+    assert (first.result(), second.result()) == ([1], [2]) and len(batch) == 2
+    with remote.batch("invalid") as batch:
+        first, second = batch(method="echo", params=[1]), batch(method="echo", params=[2])
+    assert isinstance(first.exception(), KeyError) and isinstance(second.exception(), KeyError)
+
+
 def test_graph(url):
     graph = clients.Graph(url).anything
     data = graph.execute("{ viewer { login }}")
     assert json.loads(data) == {"query": "{ viewer { login }}", "variables": {}}
     with pytest.raises(ValueError, match="reason"):
         clients.Graph.check({"errors": ["reason"]})
+    graph = clients.Graph(url, {"operationName": "name"})
+    assert graph.json == {"operationName": "name"} and not graph.persisted
+
+
+def test_persisted(graphql):
+    graph = clients.Graph("http://localhost/", persisted=True, transport=graphql)
+    assert graph.execute("{ a }", x=1) == {"query": "{ a }", "variables": {"x": 1}}
+    assert [len(body) for body in graphql.bodies] == [2, 3]
+    assert graph.execute("{ a }")["query"] == "{ a }"
+    assert "query" not in graphql.bodies[-1]
+    assert graph.execute_many([("{ a }", {}), ("{ b }", {"y": 2})])[1]["variables"] == {"y": 2}
+    assert clients.Graph.batch is clients.Remote.batch
+    assert [len(body) for body in graphql.bodies[-2:]] == [2, 1]
+    assert graph.execute_many([("{ a }", {})]) == [{"query": "{ a }", "variables": {}}]
+    with pytest.raises(ValueError, match="reason"):
+        clients.Graph("http://localhost/", transport=graphql).execute_many([("error", {})])
+    assert clients.Graph.missing(
+        {"errors": [{"extensions": {"code": "PERSISTED_QUERY_NOT_FOUND"}}]}
+    )
 
 
 def test_proxy(httpbin):
     proxy = clients.Proxy(httpbin.url, f"http://localhost:{httpbin.port}")
     urls = {proxy.get("status/500").url for _ in proxy.urls}
     assert len(urls) == len(proxy.urls)
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json={}))
+    proxy = clients.Proxy("http://localhost", transport=transport)
+    assert proxy.get("path").json() == {} and proxy.urls["http://localhost/"].latencies
+
+
+def test_pools(httpbin):
+    limits = httpx.Limits(max_connections=1)
+    mounts = {"http://example.com": None}
+    proxy = clients.Proxy(httpbin.url, pools={httpbin.url: limits}, mounts=mounts, http2=False)
+    assert proxy.get("get").status_code == 200
+    pools = proxy.pools()
+    assert list(pools) == [httpbin.url, "all://"]
+    assert pools["all://"] == {"idle": 0, "active": 0, "waiting": 0}
+    assert sum(pools[httpbin.url].values()) <= 1
+    client = clients.Client(httpbin.url, transport=httpx.MockTransport(httpx.Response))
+    assert client.pools() == {"all://": {"idle": 0, "active": 0, "waiting": 0}}
+    with pytest.raises(ValueError, match="transport"):
+        clients.Proxy(httpbin.url, pools={httpbin.url: limits}, transport=client._transport)
+
+
+def test_hooks(httpbin, hooks):
+    resource = clients.Resource(httpbin.url)
+    resource.hooks, resource.limiter = hooks, clients.Limiter()
+    assert resource.get("get")
+    (timings,) = hooks.timings
+    assert {"send", "wait", "receive_response_headers", "decode"} <= set(timings)
+    assert timings["send"] >= timings["receive_response_headers"]
+    with pytest.raises(httpx.ConnectError):
+        (resource / "unknown").get("http://localhost:1")
+    assert len(hooks.requests) == 2 and "decode" not in hooks.timings[-1]
+    proxy = clients.Proxy(httpbin.url)
+    proxy.hooks = hooks
+    assert proxy.get("get").status_code == 200
+    assert hooks.proxies == [httpbin.url + "/"] and len(hooks.timings) == 3
+
+
+def test_circuit():
+    proxy = clients.Proxy("http://localhost/", "http://127.0.0.1/")
+    stats = proxy.urls["http://localhost/"]
+    stats.threshold, stats.cooldown = 2, 60.0
+    stats.add(failures=1)
+    assert stats.state() == "closed" and proxy.priority("http://localhost/")[1] > 0.9
+    stats.add(errors=1)
+    assert stats.state() == "open" and proxy.priority("http://localhost/") is None
+    assert proxy.choice("GET") == "http://127.0.0.1/"
+    stats.cooldown = 0.0
+    assert stats.state() == "half-open" and proxy.priority("http://localhost/") == (0, 0, 0)
+    with stats:
+        assert stats.state() == "open"
+    stats.add(failures=1)
+    assert stats.opened and stats.state() == "half-open"
+    with stats:
+        stats.add(failures=0)
+    assert stats.state() == "closed" and not stats.streak
+    stats.halflife = 1e-9
+    stats.add(errors=1)
+    assert proxy.priority("http://localhost/") == (0, 0, 0)
+
+
+def test_strategies():
+    urls = "http://localhost/", "http://127.0.0.1/", "http://0.0.0.0/"
+    proxy = clients.Proxy(*urls, strategy="rotate", weights={urls[0]: 2})
+    assert [proxy.choice("GET") for _ in range(4)] == [urls[0], urls[1], urls[2], urls[0]]
+    proxy.urls[urls[1]].opened = float("inf")
+    assert [proxy.choice("GET") for _ in range(4)] == [urls[0], urls[2], urls[0], urls[0]]
+    proxy.strategy = "hash"
+    url = proxy.choice("GET", "key")
+    assert url != urls[1] and {proxy.choice("GET", "key") for _ in urls} == {url}
+    proxy.urls[url].opened = float("inf")
+    assert proxy.choice("GET", "key") not in (url, urls[1])
+    proxy.strategy = "sample"
+    assert {proxy.choice("GET") for _ in range(10)} == set(urls) - {url, urls[1]}
+    proxy = clients.Proxy(*urls[:2], strategy="sample") / "path"
+    assert proxy.choice("GET") in (urls[0] + "path/", urls[1] + "path/")
+    for url in proxy.urls.values():
+        url.opened = float("inf")
+    with pytest.raises(httpx.ConnectError, match="circuits are open"):
+        proxy.choice("GET")
+    for proxy.strategy in ("rotate", "hash"):
+        with pytest.raises(httpx.ConnectError):
+            proxy.choice("GET")
+    proxy.retry = clients.Retry(backoff=0)
+    with pytest.raises(httpx.ConnectError):
+        proxy.get()
+
+
+def test_latency(httpbin):
+    proxy = clients.Proxy(httpbin.url, "http://localhost/", balance="latency")
+    stats = proxy.urls["http://localhost/"]
+    assert stats.quantile(0.5) == 0.0
+    stats.add(latency=1.0)
+    assert stats.ewma == 1.0 and stats.quantile(0.95) == 1.0
+    stats.add(latency=0.0)
+    assert 0.0 < stats.ewma < 1.0 and stats.quantile(0.0) == 0.0 and stats.quantile(0.5) == 1.0
+    assert proxy.choice("GET") == httpbin.url + "/"
+    assert proxy.get("get").status_code == 200
+    assert proxy.urls[httpbin.url + "/"].ewma > 0.0
+
+    proxy = clients.Proxy("http://a", "http://b", balance="latency")
+    slow, fast = proxy.urls.values()
+    slow.add(latency=2.0)
+    fast.add(latency=0.05)
+    assert {proxy.choice("GET") for _ in range(10)} == {"http://b/"}
+    slow.observed -= 20 * slow.tau
+    assert slow.latency() < fast.latency()
+    assert proxy.choice("GET") == "http://a/"
+
+
+def test_retry(httpbin):
+    proxy = clients.Proxy(httpbin.url, "http://localhost:1", retry=clients.Retry(backoff=0))
+    proxy.urls[httpbin.url + "/"]["errors"] = 1
+    assert proxy.get("get").status_code == 200
+    assert proxy.urls["http://localhost:1/"]["errors"] > 0.9
+    proxy = clients.Proxy(httpbin.url, retry=clients.Retry(backoff=0))
+    assert proxy.get("status/500").status_code == 500
+    assert proxy.post("status/500").status_code == 500
+    assert round(proxy.urls[httpbin.url + "/"]["failures"]) == 4
+    proxy = clients.Proxy("http://localhost:1", retry=clients.Retry(capacity=0))
+    with pytest.raises(httpx.ConnectError):
+        proxy.get()
+    proxy.retry = clients.Retry(timeout=-1)
+    assert not list(proxy.retry.delays("GET"))
+    retry = clients.Retry(backoff=0.01, timeout=0.05, budget=0.5)
+    retry.tokens = 0
+    retry.delays("GET")
+    assert retry.tokens == 0.5
+    delays = retry.delays("GET")
+    time.sleep(0.05)
+    assert retry.tokens == 1 and not list(delays)
+
+
+def test_hedge():
+    def handler(request):
+        if request.url.host == "slow":
+            time.sleep(0.2)
+        elif request.url.host == "error":
+            raise httpx.ConnectError("refused")
+        return httpx.Response(200, json=request.url.host)
+
+    transport, hedge = httpx.MockTransport(handler), clients.Hedge(delay=0.05)
+    proxy = clients.Proxy("http://slow", "http://fast", hedge=hedge, transport=transport)
+    proxy.strategy = "rotate"
+    assert proxy.get("path").json() == "fast"
+    assert proxy.get("path").json() == "fast"
+    assert hedge.tokens == 9.1
+    proxy.hedge = clients.Hedge(delay=0.05, capacity=0)
+    assert proxy.get("path").json() == "slow"
+    proxy = clients.Proxy("http://slow", "http://error", hedge=hedge, transport=transport)
+    proxy.strategy = "rotate"
+    assert proxy.get("path").json() == "slow"
+    proxy = clients.Proxy("http://slow", hedge=hedge, transport=transport)
+    assert proxy.get("path").json() == "slow"
+    assert proxy.alternate("http://slow/") is None
+
+    def handler(request):
+        time.sleep(0.2)
+        return httpx.Response(200)
+
+    transport, hedge = httpx.MockTransport(handler), clients.Hedge(delay=0.3, workers=1)
+    proxy = clients.Proxy("http://a", "http://b", hedge=hedge, transport=transport)
+    with futures.ThreadPoolExecutor(2) as executor:
+        assert all(executor.map(proxy.get, ["path"] * 2))
+    assert proxy._executor._max_workers == 1 and hedge.tokens == hedge.capacity  # queued
+    (proxy / "path").close()
+    assert not proxy._executor._shutdown
+    proxy.close()
+    assert proxy._executor._shutdown
+    with clients.Proxy("http://a", "http://b", hedge=hedge, transport=transport) as proxy:
+        assert proxy.get("path").is_success
+    assert proxy.is_closed and proxy._executor._shutdown
+    with clients.Proxy("http://a", "http://b", hedge=hedge, transport=transport) as proxy:
+        pass
+    assert proxy.is_closed and "_executor" not in vars(proxy)
+
+    stats, hedge = clients.Proxy.Stats(), clients.Hedge()
+    assert hedge.wait("GET", stats) is None
+    stats.add(latency=0.5)
+    assert hedge.wait("GET", stats) == 0.5
+    assert hedge.wait("POST", stats) is None
 
 
 def test_clones():
@@ -127,14 +705,43 @@ def test_clones():
     resource = clients.Resource("http://localhost/").path
     assert str(resource) == "Resource(http://localhost/path/... )"
     assert type(resource.client) is clients.Client
+    resource = clients.Resource("http://localhost/")
+    assert resource.path is resource.path and resource.path.name is resource.path.name
+    view, resource.auth = resource.path, ("user", "pass")
+    assert resource.path is not view and resource.path._auth is resource._auth
+    resource.max_views, view = 1, resource.path
+    assert resource.name and list(resource._views) == ["name"]
+    assert resource.path is not view
+    view, resource.base_url = resource.path, "http://127.0.0.1/"
+    assert resource.path is not view and resource.path.url == "http://127.0.0.1/path/"
+    view, resource.trailing = resource.path, "/"
+    assert resource.path is not view and resource.path.trailing == "/"
 
     remote = clients.Remote("http://localhost/").path
     assert str(remote) == "Remote(http://localhost/path/... )"
     assert type(remote.client) is clients.Client
+    view = remote.name
+    assert remote.name is view
+    remote.json["key"] = "value"
+    assert remote.name is not view and remote.name.json == {"key": "value"}
 
     proxy = clients.Proxy("http://localhost/", "http://127.0.0.1") / "path"
     assert str(proxy) == "Proxy(https://proxies/... )"
 
+    transport, closed = httpx.MockTransport(lambda request: httpx.Response(200)), []
+    transport.close = lambda: closed.append(True)
+    client = clients.Client("http://localhost/", transport=transport)
+    with client:
+        view = client / "path"
+        with view:
+            assert view.get().is_success
+        assert view.is_closed and not closed and client.get().is_success
+        view = client / "path"
+        view.close()
+        assert view.is_closed and not closed
+    client.close()
+    assert client.is_closed and closed == [True]
+
 
 def test_singleton():
     @clients.singleton("http://localhost/")